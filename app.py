@@ -1,86 +1,230 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Form, Request, Query, Body
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import PlainTextResponse, JSONResponse
-import os
-import subprocess
-import re
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import PlainTextResponse, JSONResponse, StreamingResponse
 import ast
+import asyncio
+import os
+import json
+import time
 import traceback
 
-app = FastAPI(title="Intent Manager with Ollama")
+from code_extract import CodeFenceParser, detect_parameters, extract_code
+from fix_sessions import FixSessionManager
+from http_cache import CompressionMiddleware, cached_response
+from intent_bundle import open_bundle
+from intent_pipeline import IntentPipeline
+from intent_registry import IntentRegistry, intent_filename
+from intent_runtime import IntentRuntime, IntentRuntimeError
+from intent_store import IntentStore
+from jobs import JOBS_BUSY_TIMEOUT, JobQueue
+from llm_cache import default_cache
+from llm_pool import BATCH, OllamaBusy, priority
+from metrics import REGISTRY, MetricsMiddleware, cache_collector, llm_pool_collector, span
+from model_cascade import ModelCascade
+from ollama_client import OllamaClient
+from sandbox import ValidationPool
+from semantic_router import ROUTE_MAX_UTTERANCES, SemanticRouter
 
 TOOLS_DIR = "tools"
-OLLAMA_URL = "http://127.0.0.1:11434/api/generate"
 
-templates = Jinja2Templates(directory="templates")
+# Shared Ollama client: keep-alive connections to every server in OLLAMA_HOSTS,
+# a priority scheduler in front of them and the persistent LLM response cache
+ollama = OllamaClient(cache=default_cache())
 
-# Function to call Ollama and generate code based on a description
-async def call_ollama(description: str):
-    try:
-        prompt = (
-            f"Generate only the Python code for the following, without explanations: {description}. "
-            "Only respond with code, no additional text. Return the code within triple backticks ```python."
-        )
+# In-memory index of tools/, kept current by a filesystem watcher
+registry = IntentRegistry(TOOLS_DIR)
 
-        result = subprocess.run(
-            ["ollama", "run", "deepseek-r1:latest", prompt],
-            capture_output=True,
-            text=True
-        )
+# Versioned intent store (SQLite); tools/ holds its file export
+store = IntentStore()
+
+
+# Bring edits made directly to the files in tools/ into the store. The store is the
+# source of truth for deletions, as in store.sync() at startup: a stored intent whose
+# file disappears is exported again (delete intents with /delete_intent/)
+def sync_stored_intent(name, info):
+    if info is not None:
+        store.save(name, info.code, source="disk")
+    elif store.get(name) is not None:
+        store.export(name, TOOLS_DIR)
+        # After every listener has seen the removal
+        asyncio.get_running_loop().call_soon(registry.refresh, name)
+
+
+registry.add_listener(sync_stored_intent)
+
+# Embedding index of the intents (prompt + type description) for /route/
+router = SemanticRouter(ollama, registry, type_of=lambda name: (store.get(name) or {}).get("type"))
 
-        output = result.stdout.strip()
+# Pre-forked worker processes that execute untrusted intent code
+validator = ValidationPool()
 
-        if result.returncode == 0:
-            code_block, parameters = extract_code(output)
-            if code_block:
-                return f"# Prompt used: {description}\n\n{code_block}", parameters
-            return "⚠️ No valid code was generated.", []
+# Imported intents, cached by content hash and reloaded when they change
+# (from the precompiled bundle in INTENT_BUNDLE when their hash matches)
+runtime = IntentRuntime(registry, validator, bundle=open_bundle())
 
+# Model tiers (model_tiers.json): a small model first, larger ones when its code fails
+cascade = ModelCascade(ollama)
+
+
+# Multi-round "Fix Errors" conversations, pinned to the largest generation model
+fix_sessions = FixSessionManager(ollama, validator, model=cascade.tiers_for("generated")[-1].model)
+
+
+# One-request generation: K candidates in parallel, first valid wins, then fix rounds
+pipeline = IntentPipeline(ollama, validator, cascade, fix_sessions)
+
+
+# Accept a model output only if its code parses and runs cleanly in the sandbox
+async def check_generated_code(output: str):
+    code, _ = extract_code(output.strip())
+    if not code:
+        return False, "no code generated"
+    try:
+        ast.parse(code)
+    except SyntaxError as e:
+        return False, f"SyntaxError: {e}"
+    result = await validator.validate(code, "<generated>")
+    return result["status"] == "success", result["message"]
+
+
+# Run one queued generation, streaming its tokens into the job
+# (batch priority: interactive requests are served first; when the queue is full, wait and
+# retry, and fail the job once the queues stayed full for JOBS_BUSY_TIMEOUT seconds)
+async def run_generation_job(job):
+    priority.set(BATCH)
+    deadline = time.monotonic() + JOBS_BUSY_TIMEOUT
+    while True:
+        try:
+            return await generate_job(job)
+        except OllamaBusy as e:
+            if time.monotonic() + e.retry_after > deadline:
+                raise TimeoutError(f"the model servers stayed busy for {JOBS_BUSY_TIMEOUT:.0f}s") from e
+            job.chunks = []
+            await asyncio.sleep(e.retry_after)
+
+
+async def generate_job(job):
+    run = cascade.run(
+        build_generate_prompt(job.description), "generated", check_generated_code, stop=lambda: CodeFenceParser().feed
+    )
+    async for event, data in run.events():
+        if event == "token":
+            job.append_output(data)
         else:
-            return f"⚠️ Error executing Ollama: {result.stderr.strip()}", []
+            # The next model starts over: drop the rejected output
+            job.chunks = []
+            job.publish(event, data)
+
+    intent_code, parameters = build_intent_code(job.description, run.generation.text)
+    message = save_intent(job.intent_name, intent_code)
+    return {"message": message, "parameters": parameters, "content": intent_code}
+
+
+# Background generation jobs, journaled so they survive restarts
+jobs = JobQueue(run_generation_job)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ollama.start()
+    registry.start()
+    # Intents whose file went missing are exported again, never dropped
+    for name in store.sync(registry.intents.values(), TOOLS_DIR)["restored"]:
+        registry.refresh(name)
+    router.start()
+    validator.start()
+    cascade.start()
+    jobs.start()
+    yield
+    await jobs.stop()
+    await cascade.stop()
+    await router.stop()
+    validator.close()
+    await registry.stop()
+    store.close()
+    await ollama.aclose()
+
+
+app = FastAPI(title="Intent Manager with Ollama", lifespan=lifespan)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+REGISTRY.add_collector(cache_collector(ollama.cache))
+REGISTRY.add_collector(llm_pool_collector(ollama))
+
+
+# LLM queues full: 429 with the estimated wait until a slot frees up
+@app.exception_handler(OllamaBusy)
+async def ollama_busy_handler(request: Request, exc: OllamaBusy):
+    return JSONResponse(
+        content={"error": str(exc), "retry_after": exc.retry_after},
+        status_code=429,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
-    except Exception as e:
-        return f"⚠️ Exception while executing Ollama: {str(e)}", []
+templates = Jinja2Templates(directory="templates")
 
 
-# Function to extract only the code and detect parameters
-def extract_code(text):
-    match = re.search(r"```python\n(.*?)\n```", text, re.DOTALL)
-    code = match.group(1).strip() if match else text.strip()
+# Prompt sent to Ollama to generate an intent from its description
+def build_generate_prompt(description: str):
+    return (
+        f"Generate only the Python code for the following, without explanations: {description}. "
+        "Only respond with code, no additional text. Return the code within triple backticks ```python."
+    )
 
-    # Find all functions and their parameters
-    param_matches = re.findall(r"def\s+\w+\((.*?)\):", code)
 
-    parameters = set()  # Use a set to avoid duplicates
-    for param_match in param_matches:
-        params = [param.strip().split("=")[0] for param in param_match.split(",") if param]  # Clean up parameters
-        parameters.update(params)
+# Build the intent file content from the raw model output
+def build_intent_code(description: str, output: str):
+    code_block, parameters = extract_code(output.strip())
+    if code_block:
+        return f"# Prompt used: {description}\n\n{code_block}", parameters
+    return "⚠️ No valid code was generated.", []
 
-    return code, list(parameters)
+
+# Function to call Ollama and generate code based on a description
+async def call_ollama(description: str, use_cache: bool = True):
+    try:
+        # Stop generating as soon as the ```python block is closed
+        run = await cascade.run(
+            build_generate_prompt(description), "generated", check_generated_code, use_cache,
+            stop=lambda: CodeFenceParser().feed, stream=False,
+        ).result()
+        return build_intent_code(description, run.generation.text)
+
+    except OllamaBusy:
+        raise
+    except Exception as e:
+        return f"⚠️ Exception while executing Ollama: {str(e)}", []
+
+
+# Store a new version of an intent and export it to tools/ atomically
+def write_intent(intent_name, intent_code, intent_type=None):
+    with span("save_intent", intent=intent_name):
+        store.save(intent_name, intent_code, intent_type)
+        store.export(intent_name, TOOLS_DIR)
+        registry.refresh(intent_name)
 
 
 # Function to save generated intents
 def save_intent(intent_name, intent_code):
-    filename = os.path.join(TOOLS_DIR, f"{intent_name}.py")
-    os.makedirs(TOOLS_DIR, exist_ok=True)
-    with open(filename, "w") as f:
-        f.write(intent_code)
+    write_intent(intent_name, intent_code, "generated")
     return f"✅ Intent '{intent_name}' successfully saved."
 
 
 # Function to read the content of a tool
+# (revalidated with ETag / Last-Modified: unchanged intents answer 304 without a body)
 @app.get("/read_intent/", response_class=PlainTextResponse)
-async def read_intent_endpoint(intent_name: str = Query(...)):
-    if not intent_name.endswith(".py"):
-        intent_name += ".py"
+async def read_intent_endpoint(request: Request, intent_name: str = Query(...)):
+    intent = registry.get(intent_name)
 
-    filename = os.path.join(TOOLS_DIR, intent_name)
-
-    if not os.path.exists(filename):
+    if intent is None:
+        filename = os.path.join(TOOLS_DIR, intent_filename(intent_name))
         return PlainTextResponse(f"⚠️ File '{filename}' not found.", status_code=404)
 
-    with open(filename, "r") as f:
-        return PlainTextResponse(f.read())
+    return cached_response(
+        request, intent.code, "text/plain; charset=utf-8", etag=f'"{intent.sha256[:32]}"', last_modified=intent.mtime
+    )
 
 
 # Endpoint to delete a tool
@@ -92,11 +236,14 @@ async def delete_intent(intent_name: str = Query(...)):
 
     filename = os.path.join(TOOLS_DIR, intent_name)
 
-    if not os.path.exists(filename):
+    if registry.get(intent_name) is None:
         return JSONResponse(content={"error": f"⚠️ File not found: {filename}"}, status_code=404)
 
     try:
+        # The store first, so the file is not exported again when it disappears
+        store.delete(intent_name)
         os.remove(filename)
+        registry.remove(intent_name)
         return JSONResponse(content={"message": f"✅ Intent '{intent_name}' successfully deleted."}, status_code=200)
     except Exception as e:
         return JSONResponse(content={"error": f"⚠️ Could not delete file: {str(e)}"}, status_code=500)
@@ -107,13 +254,11 @@ def render_template(request: Request, message="", content="", parameters=None, i
     if parameters is None:
         parameters = []
 
-    intents = [f for f in os.listdir(TOOLS_DIR) if f.endswith(".py")] if os.path.exists(TOOLS_DIR) else []
     return templates.TemplateResponse(
         "form.html",
         {
             "request": request,
             "message": message,
-            "intents": intents,
             "content": content,
             "parameters": parameters,
             "intent_name": intent_name
@@ -122,15 +267,19 @@ def render_template(request: Request, message="", content="", parameters=None, i
 
 
 # Main page with the form
+# (the intent list is loaded by the page from /intents/, so the page itself does not change)
 @app.get("/")
 async def form_page(request: Request):
-    return render_template(request)
+    page = templates.get_template("form.html").render(request=request)
+    return cached_response(request, page, "text/html; charset=utf-8")
 
 
 # Generate a new intent with Ollama
 @app.post("/generate/")
-async def generate_intent(request: Request, intent_name: str = Form(...), description: str = Form(...)):
-    intent_code, parameters = await call_ollama(description)
+async def generate_intent(
+    request: Request, intent_name: str = Form(...), description: str = Form(...), no_cache: bool = Form(False)
+):
+    intent_code, parameters = await call_ollama(description, use_cache=not no_cache)
 
     # Save the intent without parameters yet
     save_intent(intent_name, intent_code)
@@ -145,20 +294,124 @@ async def generate_intent(request: Request, intent_name: str = Form(...), descri
     )
 
 
-# Endpoint to obtain the content of a specific tool
-@app.get("/read_intent/", response_class=PlainTextResponse)
-async def read_intent_endpoint(intent_name: str = Query(...)):
-    filename = os.path.join(TOOLS_DIR, intent_name)
+# Generate, validate and fix an intent in one bounded request (PIPELINE_* settings)
+@app.post("/generate_pipeline/")
+async def generate_intent_pipeline(
+    intent_name: str = Form(...), description: str = Form(...), no_cache: bool = Form(False)
+):
+    try:
+        report = await pipeline.run(intent_name, build_generate_prompt(description), use_cache=not no_cache)
+    except OllamaBusy:
+        raise
+    except Exception as e:
+        return JSONResponse(content={"error": f"⚠️ Exception while executing Ollama: {str(e)}"}, status_code=500)
+
+    if not report["code"]:
+        return JSONResponse(content={**report, "error": "⚠️ No valid code was generated."}, status_code=422)
+
+    intent_code = f"# Prompt used: {description}\n\n{report['code']}"
+    message = save_intent(intent_name, intent_code)
+    if report["status"] == "valid":
+        store.set_status(intent_name, "success", "✅ The tool's code is valid and executed correctly.")
+    else:
+        message += " ⚠️ It still fails validation."
+
+    return JSONResponse(content={
+        **report,
+        "intent_name": intent_name,
+        "content": intent_code,
+        "parameters": detect_parameters(report["code"]),
+        "message": message
+    })
+
+
+# Format one Server-Sent Event
+def sse_event(event: str, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# Generate a new intent streaming the model tokens to the browser (SSE)
+@app.post("/generate_stream/")
+async def generate_intent_stream(
+    intent_name: str = Form(...), description: str = Form(...), no_cache: bool = Form(False)
+):
+    async def events():
+        run = cascade.run(
+            build_generate_prompt(description), "generated", check_generated_code, not no_cache,
+            stop=lambda: CodeFenceParser().feed,
+        )
+        try:
+            # "escalate" events tell the browser that a larger model starts over
+            async for event, data in run.events():
+                yield sse_event(event, data)
+        except OllamaBusy as e:
+            yield sse_event("error", {"error": str(e), "retry_after": e.retry_after})
+            return
+        except Exception as e:
+            yield sse_event("error", {"error": f"⚠️ Exception while executing Ollama: {str(e)}"})
+            return
+
+        intent_code, parameters = build_intent_code(description, run.generation.text)
+        message = save_intent(intent_name, intent_code)
+        yield sse_event("done", {
+            "intent_name": intent_name,
+            "model": run.model,
+            "content": intent_code,
+            "parameters": parameters,
+            "message": message
+        })
 
-    # Ensure the name has the .py extension
-    if not intent_name.endswith(".py"):
-        filename += ".py"
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+# Queue one generation ({intent_name, description}) or a batch ({"jobs": [...]})
+@app.post("/jobs/")
+async def submit_jobs(body: dict = Body(...)):
+    items = body.get("jobs", [body])
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return JSONResponse(content={"error": "⚠️ 'jobs' must be a list of objects."}, status_code=400)
+
+    if not items or any(
+        not isinstance(item.get("intent_name"), str) or not item["intent_name"]
+        or not isinstance(item.get("description"), str) or not item["description"]
+        for item in items
+    ):
+        return JSONResponse(content={"error": "⚠️ Each job needs an intent_name and a description."}, status_code=400)
+
+    submitted = jobs.submit((item["intent_name"], item["description"]) for item in items)
+    return JSONResponse(content={"jobs": [{"id": job.id, "status": job.status} for job in submitted]}, status_code=202)
+
+
+# List generation jobs, optionally filtered by status
+@app.get("/jobs/")
+async def list_jobs(status: str = Query(None)):
+    return JSONResponse(content={
+        "jobs": [job.snapshot() for job in jobs.jobs.values() if status is None or job.status == status]
+    })
+
+
+# Status, partial output and result of one job
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse(content={"error": f"⚠️ Job '{job_id}' not found."}, status_code=404)
+    return JSONResponse(content={**job.snapshot(), "output": job.output})
+
+
+# Follow a job live: "token" and "status" Server-Sent Events until it finishes
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse(content={"error": f"⚠️ Job '{job_id}' not found."}, status_code=404)
+
+    async def events():
+        async for event, data in jobs.events(job):
+            yield sse_event(event, data)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
-    if os.path.exists(filename):
-        with open(filename, "r") as f:
-            return f.read()
-    
-    return PlainTextResponse(f"⚠️ Error: File '{filename}' not found.", status_code=404)
 
 @app.post("/save_edited_code/")
 async def save_edited_code(intent_name: str = Query(...), body: dict = Body(...)):
@@ -167,12 +420,11 @@ async def save_edited_code(intent_name: str = Query(...), body: dict = Body(...)
 
     filename = os.path.join(TOOLS_DIR, intent_name)
 
-    if not os.path.exists(filename):
+    if registry.get(intent_name) is None:
         return JSONResponse(content={"error": f"⚠️ File '{filename}' not found."}, status_code=404)
 
     try:
-        with open(filename, "w") as f:
-            f.write(body["code"])
+        write_intent(intent_name, body["code"])
 
         return JSONResponse(content={"message": "✅ Code successfully updated."}, status_code=200)
     
@@ -180,65 +432,121 @@ async def save_edited_code(intent_name: str = Query(...), body: dict = Body(...)
         return JSONResponse(content={"error": f"⚠️ Could not save the code: {str(e)}"}, status_code=500)
 
 
-# Save parameters entered by the user in the tool
+# Save parameters entered by the user in the tool (replacing the previous ones)
 @app.post("/save_params/")
 async def save_params(intent_name: str = Query(...), params: dict = Body(...)):
-    filename = os.path.join(TOOLS_DIR, f"{intent_name}.py")
-
-    if os.path.exists(filename):
-        with open(filename, "a") as f:
-            f.write("\n\n# User-entered parameters:\n")
-            for key, value in params.items():
-                f.write(f"{key} = '{value}'\n")
-        return JSONResponse(content={"message": "Parameters saved."}, status_code=200)
-    
-    return JSONResponse(content={"error": "File not found."}, status_code=404)
-
+    if store.get(intent_name) is None:
+        return JSONResponse(content={"error": "File not found."}, status_code=404)
 
-# Validate the correctness of the tool's code
+    try:
+        store.set_params(intent_name, params)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+
+    store.export(intent_name, TOOLS_DIR)
+    registry.refresh(intent_name)
+    return JSONResponse(content={"message": "Parameters saved."}, status_code=200)
+
+
+# Paginated listing of the stored intents, filtered by type/status or searched by prompt
+@app.get("/intents/")
+async def list_intents(
+    request: Request,
+    cursor: str = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    type: str = Query(None),
+    status: str = Query(None),
+    q: str = Query(None),
+):
+    page = {"items": store.search(q, limit), "next_cursor": None} if q else store.list(cursor, limit, type, status)
+    return cached_response(request, json.dumps(page, ensure_ascii=False, separators=(",", ":")), "application/json")
+
+
+# Versions of an intent, or the code of one version
+@app.get("/intent_history/")
+async def intent_history(intent_name: str = Query(...), version: int = Query(None)):
+    if version is None:
+        versions = store.history(intent_name)
+        if not versions:
+            return JSONResponse(content={"error": f"⚠️ No history for '{intent_filename(intent_name)}'."}, status_code=404)
+        return JSONResponse(content={"intent_name": intent_filename(intent_name), "versions": versions})
+
+    stored = store.version(intent_name, version)
+    if stored is None:
+        return JSONResponse(content={"error": f"⚠️ Version {version} of '{intent_filename(intent_name)}' not found."}, status_code=404)
+    return JSONResponse(content=stored)
+
+
+# Validate the correctness of the tool's code in the sandboxed worker pool
 @app.get("/validate_intent/")
 async def validate_intent(intent_name: str = Query(...)):
     if not intent_name.endswith(".py"):
         intent_name += ".py"
 
     filename = os.path.join(TOOLS_DIR, intent_name)
+    intent = registry.get(intent_name)
 
-    if not os.path.exists(filename):
+    if intent is None:
         return JSONResponse(content={"status": "error", "message": f"⚠️ File not found: '{filename}'"}, status_code=404)
 
-    try:
-        with open(filename, "r") as f:
-            code = f.read()
+    result = await validator.validate(intent.code, intent.path)
+    store.set_status(intent_name, result["status"], result["message"])
+    if result["status"] == "success":
+        return JSONResponse(content=result)
+
+    return JSONResponse(content={**result, "code": intent.code})
+
+
+# Validate every intent in tools/ in parallel across the worker pool
+@app.get("/validate_all/")
+async def validate_all():
+    intents = [registry.get(name) for name in registry.names()]
+    results = await validator.validate_many((intent.code, intent.path) for intent in intents)
+
+    results = [{"intent_name": intent.name, **result} for intent, result in zip(intents, results)]
+    store.set_statuses((result["intent_name"], result["status"], result["message"]) for result in results)
+    valid = sum(result["status"] == "success" for result in results)
+    return JSONResponse(content={
+        "summary": {
+            "total": len(results),
+            "valid": valid,
+            "invalid": len(results) - valid,
+            "rejected_by_precheck": sum(result.get("stage") == "precheck" for result in results),
+        },
+        "results": results
+    })
+
+
+# Run an intent's entry point (or the given function) from its cached module
+@app.post("/run_intent/")
+async def run_intent(intent_name: str = Query(...), body: dict = Body(default={})):
+    if registry.get(intent_name) is None:
+        filename = os.path.join(TOOLS_DIR, intent_filename(intent_name))
+        return JSONResponse(content={"error": f"⚠️ File not found: {filename}"}, status_code=404)
 
-        ast.parse(code)  # Check syntax
-        exec_globals = {}
+    started = time.perf_counter()
+    try:
+        function, result = await runtime.call(
+            intent_name, body.get("function"), body.get("args"), body.get("kwargs")
+        )
+    except IntentRuntimeError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    except Exception:
+        return JSONResponse(content={"error": f"⚠️ Error executing the intent: {traceback.format_exc()}"}, status_code=500)
 
-        try:
-            exec(code, exec_globals)  # Execute code safely
-        except ImportError as e:
-            return JSONResponse(content={
-                "status": "error",
-                "message": f"⚠️ ImportError: {str(e)}. Run 'python -m spacy download en_core_web_sm'.",
-                "code": code
-            })
+    try:
+        result = jsonable_encoder(result)
+    except (TypeError, ValueError):
+        result = repr(result)
 
-        return JSONResponse(content={"status": "success", "message": "✅ The tool's code is valid and executed correctly."})
+    return JSONResponse(content={
+        "intent_name": intent_filename(intent_name),
+        "function": function,
+        "result": result,
+        "duration": time.perf_counter() - started
+    })
 
-    except SyntaxError as e:
-        return JSONResponse(content={
-            "status": "error",
-            "message": f"⚠️ Syntax error on line {e.lineno}: {e.msg}",
-            "code": code
-        })
 
-    except Exception as e:
-        return JSONResponse(content={
-            "status": "error",
-            "message": f"⚠️ Error executing the code: {traceback.format_exc()}",
-            "code": code
-        })
-
-        
 @app.post("/fix_errors/")
 async def fix_errors(body: dict = Body(...)):
     original_code = body.get("code", "")
@@ -252,15 +560,124 @@ async def fix_errors(body: dict = Body(...)):
             f"The code to fix is:\n```python\n{original_code}\n```"
         )
 
-        result = subprocess.run(
-            ["ollama", "run", "deepseek-r1:latest", prompt],
-            capture_output=True,
-            text=True
+        run = await cascade.run(
+            prompt, "generated", check_generated_code, not body.get("no_cache", False),
+            stop=lambda: CodeFenceParser().feed, stream=False,
+        ).result()
+
+        fixed_code, _ = extract_code(run.generation.text)
+
+        return JSONResponse(
+            content={"fixed_code": fixed_code, "model": run.model, "message": "✅ Code automatically corrected."},
+            status_code=200
         )
 
-        fixed_code = extract_code(result.stdout)
+    except OllamaBusy:
+        raise
+    except Exception as e:
+        return JSONResponse(content={"error": f"⚠️ Error fixing the code: {str(e)}"}, status_code=500)
+
+
+# Hit/miss counters of the LLM response cache
+@app.get("/cache_stats/")
+async def cache_stats():
+    if ollama.cache is None:
+        return JSONResponse(content={"enabled": False})
+    return JSONResponse(content={"enabled": True, **ollama.cache.stats()})
+
+
+# Start a fix session for an intent (on its stored code, or the code being edited)
+@app.post("/fix_sessions/")
+async def create_fix_session(body: dict = Body(...)):
+    intent_name = body.get("intent_name")
+    intent = registry.get(intent_name) if intent_name else None
+    code = body.get("code") or (intent.code if intent is not None else None)
+
+    if not code:
+        return JSONResponse(content={"error": "⚠️ No code received for correction."}, status_code=400)
+
+    session = fix_sessions.create(intent_filename(intent_name) if intent_name else None, code)
+    return JSONResponse(content=session.snapshot(), status_code=201)
+
 
-        return JSONResponse(content={"fixed_code": fixed_code, "message": "✅ Code automatically corrected."}, status_code=200)
+# One repair round: validate the code, send the error (and the user's edits) to the model
+@app.post("/fix_sessions/{session_id}/iterate")
+async def iterate_fix_session(session_id: str, body: dict = Body(default={})):
+    session = fix_sessions.get(session_id)
+    if session is None:
+        return JSONResponse(content={"error": f"⚠️ Fix session '{session_id}' not found."}, status_code=404)
 
+    try:
+        iteration = await fix_sessions.iterate(session, body.get("code"), use_cache=not body.get("no_cache", False))
+    except OllamaBusy:
+        raise
     except Exception as e:
         return JSONResponse(content={"error": f"⚠️ Error fixing the code: {str(e)}"}, status_code=500)
+    return JSONResponse(content={"session_id": session.id, **iteration})
+
+
+# Iteration history of a fix session
+@app.get("/fix_sessions/{session_id}")
+async def get_fix_session(session_id: str):
+    session = fix_sessions.get(session_id)
+    if session is None:
+        return JSONResponse(content={"error": f"⚠️ Fix session '{session_id}' not found."}, status_code=404)
+    return JSONResponse(content=session.snapshot())
+
+
+@app.delete("/fix_sessions/{session_id}")
+async def close_fix_session(session_id: str):
+    if not fix_sessions.close(session_id):
+        return JSONResponse(content={"error": f"⚠️ Fix session '{session_id}' not found."}, status_code=404)
+    return JSONResponse(content={"message": "✅ Fix session closed."})
+
+
+# Route utterances ({"utterance": ...} or {"utterances": [...]}) to the most similar intents
+@app.post("/route/")
+async def route_utterances(body: dict = Body(...)):
+    utterances = body["utterances"] if "utterances" in body else [body.get("utterance")]
+    if not isinstance(utterances, list) or not utterances:
+        return JSONResponse(content={"error": "⚠️ 'utterances' must be a non-empty list of strings."}, status_code=400)
+    if not all(isinstance(utterance, str) and utterance for utterance in utterances):
+        return JSONResponse(content={"error": "⚠️ No utterance received."}, status_code=400)
+    if len(utterances) > ROUTE_MAX_UTTERANCES:
+        return JSONResponse(
+            content={"error": f"⚠️ At most {ROUTE_MAX_UTTERANCES} utterances per request."}, status_code=400
+        )
+    k, min_score = body.get("k", 3), body.get("min_score")
+    if not isinstance(k, int) or isinstance(k, bool) or k < 1:
+        return JSONResponse(content={"error": "⚠️ 'k' must be an integer of at least 1."}, status_code=400)
+    if min_score is not None and (not isinstance(min_score, (int, float)) or isinstance(min_score, bool)):
+        return JSONResponse(content={"error": "⚠️ 'min_score' must be a number."}, status_code=400)
+
+    started = time.perf_counter()
+    try:
+        routes = await router.route(utterances, min(k, max(1, len(router.index))), min_score)
+    except OllamaBusy:
+        raise
+    except Exception as e:
+        return JSONResponse(content={"error": f"⚠️ Exception while executing Ollama: {str(e)}"}, status_code=500)
+
+    return JSONResponse(content={
+        "results": [{"utterance": utterance, "intents": intents} for utterance, intents in zip(utterances, routes)],
+        "index": router.snapshot(),
+        "duration": time.perf_counter() - started
+    })
+
+
+# Ollama backends (health, in-flight requests) and the scheduler queues per priority
+@app.get("/llm_pool/")
+async def llm_pool():
+    return JSONResponse(content=ollama.snapshot())
+
+
+# Model tiers in use and per-model attempts, success rate and latency
+@app.get("/model_stats/")
+async def model_stats():
+    return JSONResponse(content=cascade.snapshot())
+
+
+# Prometheus metrics: request latency per route, LLM calls, validation and cache
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
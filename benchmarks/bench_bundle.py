@@ -0,0 +1,150 @@
+"""
+Benchmark of serving intents with and without a precompiled bundle.
+
+Writes a synthetic set of intents, builds a sandbox-validated bundle
+from it and starts a fresh process per mode that does what app.py
+does: scan tools/ into an IntentRegistry, start the ValidationPool,
+then serve --served intents through IntentRuntime.call.
+
+  source   every first call validates the intent in the sandbox and compiles it
+  bundle   IntentRuntime(bundle=...): first calls skip both (hashes match)
+
+The registry scan is the same in both modes, so "startup" barely
+changes; the bundle only saves work on each intent's first call.
+
+    python benchmarks/bench_bundle.py --intents 500 --served 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("source", "bundle")
+
+
+# A generated-looking intent: prompt header, helpers and a process() entry point
+def synthetic_intent(index: int, rng: random.Random, helpers: int) -> str:
+    lines = [f"# Prompt used: synthetic intent number {index}", "", "import re", "import json", ""]
+    for helper in range(helpers):
+        words = [f"w{rng.randrange(10000)}" for _ in range(8)]
+        lines += [
+            f"def _helper_{helper}(text):",
+            f"    keywords = {words!r}",
+            "    tokens = re.findall(r'\\w+', text.lower())",
+            "    return [token for token in tokens if token in keywords]",
+            "",
+        ]
+    lines += [
+        "def process(query, limit=10):",
+        f"    matches = [match for helper in ({', '.join(f'_helper_{h}' for h in range(helpers))},) for match in helper(query)]",
+        "    return json.dumps({'matches': matches[:limit]})",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+async def serve(mode: str, tools_dir: str, bundle_path: str, served: list) -> dict:
+    from intent_bundle import IntentBundle
+    from intent_registry import IntentRegistry
+    from intent_runtime import IntentRuntime
+    from sandbox import ValidationPool
+
+    started = time.perf_counter()
+    registry = IntentRegistry(tools_dir)
+    registry.load()
+    validator = ValidationPool()
+    validator.start()
+    runtime = IntentRuntime(registry, validator, bundle=IntentBundle(bundle_path) if mode == "bundle" else None)
+    ready = time.perf_counter()
+    try:
+        first_calls = []
+        for name in served:
+            call_started = time.perf_counter()
+            await runtime.call(name, args=["w1 w2 w3"])
+            first_calls.append(time.perf_counter() - call_started)
+        finished = time.perf_counter()
+    finally:
+        validator.close()
+
+    import resource
+
+    first_calls.sort()
+    return {
+        "startup_ms": (ready - started) * 1000,
+        "first_calls_ms": (finished - ready) * 1000,
+        "first_call_p50_ms": first_calls[len(first_calls) // 2] * 1000,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--intents", type=int, default=500)
+    parser.add_argument("--helpers", type=int, default=6, help="helper functions per intent")
+    parser.add_argument("--served", type=int, default=20, help="intents called after startup")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per mode (the best one is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--tools-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--bundle", help=argparse.SUPPRESS)
+    parser.add_argument("--names", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(serve(args.child, args.tools_dir, args.bundle, json.loads(args.names)))))
+        return
+
+    from intent_bundle import build_bundle
+    from intent_registry import IntentRegistry
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="bench_bundle_")
+    try:
+        tools_dir = os.path.join(workdir, "tools")
+        os.makedirs(tools_dir)
+        for index in range(args.intents):
+            with open(os.path.join(tools_dir, f"intent_{index}.py"), "w", encoding="utf-8") as f:
+                f.write(synthetic_intent(index, rng, args.helpers))
+
+        registry = IntentRegistry(tools_dir)
+        registry.load()
+        started = time.perf_counter()
+        manifest = build_bundle(registry.intents.values(), os.path.join(workdir, "intents.zip"), sandbox=True)
+        build_time = time.perf_counter() - started
+        print(
+            f"intents: {args.intents}  bundle: {os.path.getsize(manifest['path']) / 1e6:.1f} MB  "
+            f"build (sandbox): {build_time:.1f}s  served: {args.served}"
+        )
+
+        names = json.dumps(rng.sample(sorted(manifest["intents"]), min(args.served, len(manifest["intents"]))))
+        print(f"{'mode':<8} {'startup ms':>11} {'calls ms':>9} {'p50 call ms':>12} {'process ms':>11} {'rss MB':>7}")
+        for mode in MODES:
+            runs = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--child", mode, "--tools-dir", tools_dir,
+                     "--bundle", manifest["path"], "--names", names],
+                    cwd=REPO_DIR, capture_output=True, text=True, check=True,
+                ).stdout
+                runs.append({**json.loads(output.splitlines()[-1]), "process_ms": (time.perf_counter() - started) * 1000})
+            best = min(runs, key=lambda run: run["startup_ms"] + run["first_calls_ms"])
+            print(
+                f"{mode:<8} {best['startup_ms']:>11.1f} {best['first_calls_ms']:>9.1f} {best['first_call_p50_ms']:>12.2f} "
+                f"{best['process_ms']:>11.1f} {best['max_rss_mb']:>7.1f}"
+            )
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark of the keyword intent tools before and after IntentMatcher.
+
+Runs the baseline tools/newintent.py (find_intents) and tools/otromas.py
+(get_intents), copied unchanged from the first commit into
+benchmarks/baseline_tools/, against the current ones on the same
+utterances: sentences mixing each tool's keywords with filler words.
+
+The baseline tools need NLTK (punkt and stopwords data) and spaCy. When
+one cannot be imported, or fails on a call, the failure is reported as
+it is instead of being timed: e.g. the baseline otromas.py imports
+`en_core_web_sm` from `spacy.lang.en`, where spaCy does not provide it
+(the model is a separate package), and the baseline find_intents raises
+KeyError on every prompt that contains one of its keywords.
+
+    python benchmarks/bench_matcher.py --utterances 2000 --words 30
+"""
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_tools")
+
+sys.path.insert(0, REPO_DIR)
+
+# (tool file, function, keywords the utterances are built from)
+TOOLS = [
+    ("newintent.py", "find_intents", ["intent", "goal", "target", "requirement", "priority"]),
+    ("otromas.py", "get_intents", ["banking", "financial", "service", "general", "emotional", "bank", "money", "help"]),
+]
+FILLER = "the a client wants to know about my our next week please check this and that for".split()
+
+
+def load(path: str, label: str):
+    spec = importlib.util.spec_from_file_location(label, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_utterances(keywords: list, n_utterances: int, words: int, rng: random.Random) -> list:
+    utterances = []
+    for _ in range(n_utterances):
+        # About one word in ten is a keyword, in any case
+        tokens = [rng.choice(keywords) if rng.random() < 0.1 else rng.choice(FILLER) for _ in range(words)]
+        tokens = [token.upper() if rng.random() < 0.1 else token for token in tokens]
+        utterances.append(" ".join(tokens) + rng.choice([".", "?", "!"]))
+    return utterances
+
+
+# Time every call; failed calls are counted, not timed
+def run(function, utterances: list) -> dict:
+    results, errors, elapsed = [], {}, 0.0
+    for text in utterances:
+        started = time.perf_counter()
+        try:
+            result = function(text)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            errors[error] = errors.get(error, 0) + 1
+            results.append(None)
+            continue
+        elapsed += time.perf_counter() - started
+        results.append(result)
+    return {"results": results, "errors": errors, "seconds": elapsed, "calls": len(utterances) - sum(errors.values())}
+
+
+def report(label: str, stats: dict):
+    calls = stats["calls"]
+    rate = f"{calls / stats['seconds']:12.0f} calls/s" if calls and stats["seconds"] else f"{'-':>12} calls/s"
+    print(f"  {label:<9} {stats['seconds'] * 1000:9.2f} ms  {rate}  ({calls} ok, {sum(stats['errors'].values())} failed)")
+    for error, count in sorted(stats["errors"].items(), key=lambda item: -item[1])[:3]:
+        print(f"    ⚠️ {count} x {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--utterances", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=30, help="words per utterance")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for filename, function_name, keywords in TOOLS:
+        utterances = build_utterances(keywords, args.utterances, args.words, rng)
+        print(f"{filename} {function_name}(): {args.utterances} utterances of {args.words} words")
+
+        current_module = load(os.path.join(REPO_DIR, "tools", filename), f"current_{filename[:-3]}")
+        current = run(getattr(current_module, function_name), utterances)
+        try:
+            baseline_module = load(os.path.join(BASELINE_DIR, filename), f"baseline_{filename[:-3]}")
+        except Exception as e:
+            print(f"  baseline  ⚠️ cannot be imported: {type(e).__name__}: {e}")
+            report("current", current)
+            continue
+
+        baseline = run(getattr(baseline_module, function_name), utterances)
+        report("baseline", baseline)
+        report("current", current)
+        compared = [(old, new) for old, new in zip(baseline["results"], current["results"]) if old is not None]
+        if compared:
+            same = sum(sorted(old) == sorted(new) for old, new in compared)
+            print(f"  same answer on {same} of the {len(compared)} utterances the baseline answered")
+        if baseline["calls"] and current["calls"]:
+            speedup = (baseline["seconds"] / baseline["calls"]) / (current["seconds"] / current["calls"])
+            print(f"  speedup per answered call: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
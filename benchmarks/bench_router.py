@@ -0,0 +1,160 @@
+"""
+Benchmark of the semantic intent router.
+
+Embeds synthetic intent descriptions and utterances through an
+Ollama-compatible /api/embed endpoint, then times top-k queries on the
+VectorIndex (batched matrix product) against a per-intent Python loop,
+plus incremental adds and removals. With --spawn the fake Ollama server
+is started on --port, so no embedding model is needed:
+
+    python benchmarks/bench_router.py --spawn --intents 2000 --queries 5000 --batch 64
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ollama_client import OllamaClient  # noqa: E402
+from semantic_router import EMBED_BATCH, VectorIndex  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def build_dataset(n_intents: int, n_queries: int, words: int, seed: int):
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(n_intents * 4)]
+    intents = {f"intent_{i}.py": " ".join(rng.choice(vocabulary) for _ in range(words)) for i in range(n_intents)}
+    # Each utterance reuses half of the words of a random intent
+    texts = list(intents.values())
+    queries = [
+        " ".join(rng.sample(rng.choice(texts).split(), words // 2) + [rng.choice(vocabulary) for _ in range(words // 2)])
+        for _ in range(n_queries)
+    ]
+    return intents, queries
+
+
+async def embed_all(client: OllamaClient, texts: list, model: str) -> list:
+    batches = [texts[i:i + EMBED_BATCH] for i in range(0, len(texts), EMBED_BATCH)]
+    # Within the scheduler's capacity, so no call is refused with OllamaBusy
+    limit = asyncio.Semaphore(client.backend_concurrency)
+
+    async def embed(batch):
+        async with limit:
+            return await client.embed(batch, model)
+
+    results = await asyncio.gather(*(embed(batch) for batch in batches))
+    return [vector for batch in results for vector in batch]
+
+
+# Previous approach: cosine against every intent in Python, then sort
+def python_top_k(names: list, vectors: list, query: list, k: int) -> list:
+    query_norm = math.sqrt(sum(x * x for x in query)) or 1.0
+    scores = []
+    for name, vector in zip(names, vectors):
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        scores.append((sum(a * b for a, b in zip(query, vector)) / (norm * query_norm), name))
+    return [name for _, name in sorted(scores, reverse=True)[:k]]
+
+
+def wait_until_up(url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not start")
+
+
+async def run(args):
+    intents, queries = build_dataset(args.intents, args.queries, args.words, args.seed)
+    client = OllamaClient(f"http://127.0.0.1:{args.port}")
+    try:
+        started = time.perf_counter()
+        intent_vectors = await embed_all(client, list(intents.values()), args.model)
+        embed_intents_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        query_vectors = await embed_all(client, queries, args.model)
+        embed_queries_time = time.perf_counter() - started
+    finally:
+        await client.aclose()
+
+    names = list(intents)
+    index = VectorIndex()
+    started = time.perf_counter()
+    index.add(names, intent_vectors)
+    build_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = []
+    for i in range(0, len(query_vectors), args.batch):
+        results.extend(index.query(query_vectors[i:i + args.batch], args.k))
+    query_time = time.perf_counter() - started
+
+    sample = min(args.python_sample, len(query_vectors))
+    started = time.perf_counter()
+    slow = [python_top_k(names, intent_vectors, vector, args.k) for vector in query_vectors[:sample]]
+    python_time = time.perf_counter() - started
+    agree = sum(fast[0][0] == expected[0] for fast, expected in zip(results, slow))
+
+    # Incremental updates: re-add (replace) and remove 10% of the intents
+    changed = names[:max(1, len(names) // 10)]
+    started = time.perf_counter()
+    index.add(changed, intent_vectors[:len(changed)])
+    for name in changed:
+        index.remove(name)
+    update_time = time.perf_counter() - started
+
+    per_query_us = query_time / len(query_vectors) * 1e6
+    python_us = python_time / sample * 1e6
+    print(f"intents: {args.intents}  queries: {args.queries}  dim: {index.dim}  batch: {args.batch}  k: {args.k}")
+    print(f"embedding intents: {embed_intents_time:.2f}s ({args.intents / embed_intents_time:.0f}/s)")
+    print(f"embedding queries: {embed_queries_time:.2f}s ({args.queries / embed_queries_time:.0f}/s)")
+    print(f"index build:       {build_time * 1000:.1f} ms")
+    print(f"index query:       {per_query_us:.1f} us/query")
+    print(f"python loop:       {python_us:.1f} us/query ({python_us / per_query_us:.0f}x slower, {sample} queries)")
+    print(f"top-1 agreement:   {agree}/{sample}")
+    print(f"updates:           {update_time / (2 * len(changed)) * 1e6:.1f} us per add/remove ({len(changed)} intents)")
+    assert agree == sample, "index and python loop disagree"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--intents", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=12, help="words per intent description and utterance")
+    parser.add_argument("--batch", type=int, default=64, help="queries per index call")
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--python-sample", type=int, default=100, help="queries timed with the Python loop")
+    parser.add_argument("--model", default="nomic-embed-text")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--spawn", action="store_true", help="start the fake Ollama server on --port")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    process = None
+    if args.spawn:
+        process = subprocess.Popen(
+            [sys.executable, "benchmarks/fake_ollama.py", "--port", str(args.port), "--embed-latency", "0"], cwd=REPO_DIR
+        )
+        wait_until_up(f"http://127.0.0.1:{args.port}/api/tags")
+    try:
+        asyncio.run(run(args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Check of opensearch_client against the fake OpenSearch server.
+
+Starts benchmarks/fake_opensearch.py on --port and runs the client's
+search, msearch and scan paths against it: first with point in time
+support (scan pages with search_after over a PIT, which is closed at
+the end or when the scan is abandoned), then with --no-pit (scan falls
+back to search_after on the index). Also checks that concurrent
+searches share the client's connection pool. Exits non-zero on the
+first failing check.
+
+    python benchmarks/check_opensearch.py --docs 2500 --page-size 300
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from opensearch_client import OpenSearchClient  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX = "docs"
+
+
+def wait_until_up(url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not start")
+
+
+def check(condition: bool, message: str):
+    if not condition:
+        raise AssertionError(message)
+    print(f"✅ {message}")
+
+
+async def stats(client: OpenSearchClient) -> dict:
+    return (await client.http.get("/stats")).json()
+
+
+async def run_checks(args, pit: bool):
+    client = OpenSearchClient(f"http://127.0.0.1:{args.port}", max_connections=args.connections)
+    docs = args.docs
+    evens = (docs + 1) // 2
+    try:
+        page = await client.search(INDEX, q="even")
+        check(page["hits"]["total"]["value"] == evens, f"search q=even finds {evens} documents")
+
+        searches = [
+            (INDEX, {"query": {"query_string": {"query": "odd"}}, "size": 5}),
+            (None, {"query": {"match": {"text": "red"}}, "size": 5}),
+            ("missing", {"query": {"match_all": {}}}),
+            (INDEX, {"query": {"match_all": {}}, "size": 0}),
+        ]
+        responses = await client.msearch(searches)
+        expected = [(await client.search(index, body))["hits"]["total"]["value"] for index, body in searches[:2]]
+        check(
+            len(responses) == len(searches)
+            and [response["hits"]["total"]["value"] for response in responses[:2]] == expected
+            and responses[2]["status"] == 404
+            and responses[3]["hits"]["total"]["value"] == docs,
+            f"msearch answers {len(searches)} searches in order, the failed one in place",
+        )
+
+        before = await stats(client)
+        ids = [hit["_id"] async for hit in client.scan(INDEX, page_size=args.page_size)]
+        after = await stats(client)
+        pages = after["search"] - before["search"]
+        check(ids == [str(i) for i in range(docs)], f"scan returns all {docs} documents once, in order")
+        # A last, shorter (or empty) page ends the scan
+        check(pages == docs // args.page_size + 1, f"scan fetches {pages} pages of {args.page_size}")
+        if pit:
+            check(
+                after["pit_opened"] - before["pit_opened"] == 1 and after["open_pits"] == 0,
+                "scan pages over one point in time and closes it",
+            )
+        else:
+            check(
+                after["pit_opened"] == 0 and after["pit_rejected"] > before["pit_rejected"],
+                "scan falls back to search_after on the index without point in time",
+            )
+
+        reds = [hit["_source"]["number"] async for hit in client.scan(INDEX, {"match": {"text": "red"}}, args.page_size)]
+        check(reds == list(range(0, docs, 3)), f"scan with a query returns its {len(reds)} matches")
+
+        scan = client.scan(INDEX, page_size=args.page_size)
+        first = []
+        async for hit in scan:
+            first.append(hit)
+            if len(first) > args.page_size:
+                break
+        await scan.aclose()
+        check((await stats(client))["open_pits"] == 0, "an abandoned scan closes its point in time")
+
+        before = await stats(client)
+        await asyncio.gather(*(client.search(INDEX, q=f"doc{i % docs}") for i in range(args.concurrency)))
+        after = await stats(client)
+        check(
+            after["connections"] - before["connections"] <= args.connections,
+            f"{args.concurrency} concurrent searches use at most {args.connections} new connections "
+            f"({after['connections'] - before['connections']})",
+        )
+        check(after["search"] - before["search"] == args.concurrency, "every concurrent search is answered")
+    finally:
+        await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9201)
+    parser.add_argument("--docs", type=int, default=2500)
+    parser.add_argument("--page-size", type=int, default=300)
+    parser.add_argument("--connections", type=int, default=4, help="client connection pool size")
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent searches in the pool check")
+    args = parser.parse_args()
+
+    for pit in (True, False):
+        print(f"== {'with' if pit else 'without'} point in time")
+        command = [sys.executable, "benchmarks/fake_opensearch.py", "--port", str(args.port), "--docs", str(args.docs)]
+        process = subprocess.Popen(command + ([] if pit else ["--no-pit"]), cwd=REPO_DIR)
+        try:
+            wait_until_up(f"http://127.0.0.1:{args.port}/stats")
+            asyncio.run(run_checks(args, pit))
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
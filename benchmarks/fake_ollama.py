@@ -0,0 +1,166 @@
+"""
+Fake Ollama server for benchmarks and local development.
+
+Emulates the streaming /api/generate endpoint (NDJSON chunks ending with
+a `done` chunk carrying a context) and /api/tags. The output is a
+<think> block, a ```python block and trailing prose, like deepseek-r1.
+Latency, token rate, output length and error rate are configurable.
+A request without prompt loads the model, like Ollama's warm-up call.
+With --models, other models answer 404; --broken-models answer code
+with a syntax error (to exercise the model cascade). /api/embed returns
+hashed bag-of-words vectors, so texts sharing words are similar.
+
+    python benchmarks/fake_ollama.py --port 11434 --ttft 0.2 --token-rate 50 --error-rate 0.01
+    python benchmarks/fake_ollama.py --models qwen2.5-coder:1.5b deepseek-r1:latest --broken-models qwen2.5-coder:1.5b
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Behaviour of the fake, set from the command line (or FAKE_OLLAMA_* env vars)
+settings = {
+    "ttft": float(os.getenv("FAKE_OLLAMA_TTFT", "0.1")),
+    "token_rate": float(os.getenv("FAKE_OLLAMA_TOKEN_RATE", "100")),
+    "think_tokens": int(os.getenv("FAKE_OLLAMA_THINK_TOKENS", "20")),
+    "tail_tokens": int(os.getenv("FAKE_OLLAMA_TAIL_TOKENS", "50")),
+    "error_rate": float(os.getenv("FAKE_OLLAMA_ERROR_RATE", "0")),
+    "models": [],
+    "broken_models": [],
+    "embed_dim": int(os.getenv("FAKE_OLLAMA_EMBED_DIM", "384")),
+    "embed_latency": float(os.getenv("FAKE_OLLAMA_EMBED_LATENCY", "0.005")),
+}
+
+stats = {"requests": 0, "errors": 0, "cancelled": 0, "tokens": 0, "loads": 0, "embeddings": 0}
+
+app = FastAPI(title="Fake Ollama")
+
+
+# Deterministic answer for a prompt, split into word-sized tokens
+def fake_tokens(prompt: str, broken: bool = False) -> list:
+    digest = hashlib.sha256(prompt.encode()).hexdigest()[:8]
+    think = " ".join(["thinking"] * settings["think_tokens"])
+    code = f"def process(query, limit=10):\n    # {digest}\n    return {{'query': query, 'limit': limit}}"
+    if broken:
+        code = code.replace("):", ")", 1)
+    tail = " ".join(["explanation"] * settings["tail_tokens"])
+    text = f"<think>{think}</think>\n```python\n{code}\n```\n{tail}"
+    return [token for token in text.replace(" ", " \0").split("\0") if token]
+
+
+@app.post("/api/generate")
+async def generate(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    model = body.get("model")
+
+    if settings["models"] and model not in settings["models"]:
+        return JSONResponse(content={"error": f"model '{model}' not found"}, status_code=404)
+
+    if not body.get("prompt"):
+        stats["loads"] += 1
+        return {"model": model, "response": "", "done": True, "done_reason": "load"}
+
+    if random.random() < settings["error_rate"]:
+        stats["errors"] += 1
+        return JSONResponse(content={"error": "fake error"}, status_code=500)
+
+    tokens = fake_tokens(body["prompt"], model in settings["broken_models"])
+    context = list(range(len(tokens)))
+
+    if body.get("stream") is False:
+        await asyncio.sleep(settings["ttft"] + len(tokens) / settings["token_rate"])
+        stats["tokens"] += len(tokens)
+        return {"model": body.get("model"), "response": "".join(tokens), "done": True, "context": context}
+
+    async def chunks():
+        finished = False
+        try:
+            await asyncio.sleep(settings["ttft"])
+            for token in tokens:
+                yield json.dumps({"model": body.get("model"), "response": token, "done": False}) + "\n"
+                stats["tokens"] += 1
+                await asyncio.sleep(1 / settings["token_rate"])
+            yield json.dumps({
+                "model": body.get("model"), "response": "", "done": True, "done_reason": "stop",
+                "context": context, "eval_count": len(tokens)
+            }) + "\n"
+            finished = True
+        finally:
+            if not finished:
+                stats["cancelled"] += 1
+
+    return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+
+# Deterministic embedding: every word adds +-1 to a dimension chosen by its hash
+def fake_embedding(text: str) -> list:
+    vector = [0.0] * settings["embed_dim"]
+    for word in re.findall(r"\w+", text.lower()):
+        digest = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "big")
+        vector[digest % settings["embed_dim"]] += 1.0 if digest >> 63 else -1.0
+    return vector
+
+
+@app.post("/api/embed")
+async def embed(request: Request):
+    body = await request.json()
+    model = body.get("model")
+    if settings["models"] and model not in settings["models"]:
+        return JSONResponse(content={"error": f"model '{model}' not found"}, status_code=404)
+
+    texts = body.get("input", [])
+    texts = [texts] if isinstance(texts, str) else texts
+    stats["embeddings"] += len(texts)
+    await asyncio.sleep(settings["embed_latency"])
+    return {"model": model, "embeddings": [fake_embedding(text) for text in texts]}
+
+
+@app.get("/api/tags")
+async def tags():
+    return {"models": [{"name": model} for model in settings["models"] or ["deepseek-r1:latest"]]}
+
+
+@app.get("/stats")
+async def get_stats():
+    return {**stats, "settings": settings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--ttft", type=float, default=settings["ttft"], help="seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=settings["token_rate"], help="tokens per second")
+    parser.add_argument("--think-tokens", type=int, default=settings["think_tokens"])
+    parser.add_argument("--tail-tokens", type=int, default=settings["tail_tokens"], help="prose after the code block")
+    parser.add_argument("--error-rate", type=float, default=settings["error_rate"], help="fraction of requests failing with 500")
+    parser.add_argument("--models", nargs="*", default=[], help="models that exist (default: any)")
+    parser.add_argument("--broken-models", nargs="*", default=[], help="models whose code has a syntax error")
+    parser.add_argument("--embed-dim", type=int, default=settings["embed_dim"])
+    parser.add_argument("--embed-latency", type=float, default=settings["embed_latency"], help="seconds per /api/embed call")
+    args = parser.parse_args()
+
+    settings.update(
+        ttft=args.ttft,
+        token_rate=args.token_rate,
+        think_tokens=args.think_tokens,
+        tail_tokens=args.tail_tokens,
+        error_rate=args.error_rate,
+        models=args.models,
+        broken_models=args.broken_models,
+        embed_dim=args.embed_dim,
+        embed_latency=args.embed_latency,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Fake OpenSearch server for checking opensearch_client locally.
+
+Serves one in-memory index of generated documents through the endpoints
+the client uses: /_search and /{index}/_search (match_all,
+query_string, match and the `q` URL parameter, `sort: ["_doc"]` with
+search_after), /_msearch and /{index}/_msearch (NDJSON), and point in
+time open/close. With --no-pit the point in time endpoint answers 400,
+like a cluster without PIT support. /stats counts requests per endpoint
+and the client connections seen, to check that the pool is reused.
+
+    python benchmarks/fake_opensearch.py --port 9201 --docs 2500
+    python benchmarks/fake_opensearch.py --port 9201 --no-pit
+"""
+import argparse
+import json
+import os
+import re
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Behaviour of the fake, set from the command line (or FAKE_OPENSEARCH_* env vars)
+settings = {
+    "index": os.getenv("FAKE_OPENSEARCH_INDEX", "docs"),
+    "docs": int(os.getenv("FAKE_OPENSEARCH_DOCS", "1000")),
+    "pit": os.getenv("FAKE_OPENSEARCH_PIT", "1") != "0",
+}
+
+COLORS = ("red", "green", "blue")
+stats = {"search": 0, "msearch": 0, "pit_opened": 0, "pit_closed": 0, "pit_rejected": 0, "connections": set()}
+pits = {}
+
+app = FastAPI(title="Fake OpenSearch")
+
+
+# Document i: its number and color as words, so queries select known subsets
+def document(i: int) -> dict:
+    parity = "even" if i % 2 == 0 else "odd"
+    return {"title": f"document {i}", "text": f"doc{i} {parity} {COLORS[i % len(COLORS)]}", "number": i}
+
+
+def error(status: int, reason: str) -> JSONResponse:
+    return JSONResponse(content={"error": {"type": "fake_exception", "reason": reason}, "status": status}, status_code=status)
+
+
+def matches(query: dict, source: dict) -> bool:
+    if not query or "match_all" in query:
+        return True
+    if "query_string" in query:
+        text = query["query_string"]["query"]
+    elif "match" in query:
+        text = next(iter(query["match"].values()))
+        text = text["query"] if isinstance(text, dict) else text
+    else:
+        raise ValueError(f"unsupported query {list(query)}")
+    words = set(re.findall(r"\w+", source["text"]))
+    return all(word in words for word in re.findall(r"\w+", str(text).lower()))
+
+
+def run_search(index: str, body: dict, q: str = None) -> dict:
+    if index != settings["index"]:
+        raise LookupError(f"no such index [{index}]")
+    query = {"query_string": {"query": q}} if q else body.get("query")
+    if body.get("sort", ["_doc"]) != ["_doc"]:
+        raise ValueError("only sort [\"_doc\"] is supported")
+    after = body.get("search_after", [-1])[0]
+    size = body.get("size", 10)
+
+    hits, total = [], 0
+    for i in range(settings["docs"]):
+        source = document(i)
+        if not matches(query, source):
+            continue
+        total += 1
+        if i > after and len(hits) < size:
+            hits.append({"_index": index, "_id": str(i), "_score": None, "_source": source, "sort": [i]})
+    return {"took": 1, "timed_out": False, "hits": {"total": {"value": total, "relation": "eq"}, "max_score": None, "hits": hits}}
+
+
+def search_response(request: Request, index: str, body: dict) -> JSONResponse:
+    stats["search"] += 1
+    stats["connections"].add(request.client)
+    pit = body.pop("pit", None)
+    if pit is not None:
+        if index is not None:
+            return error(400, "[indices] cannot be used with point in time")
+        index = pits.get(pit["id"])
+        if index is None:
+            return error(404, "No search context found for id")
+    elif index is None:
+        index = settings["index"]
+    try:
+        result = run_search(index, body, request.query_params.get("q"))
+    except LookupError as e:
+        return error(404, str(e))
+    except (ValueError, KeyError, TypeError) as e:
+        return error(400, str(e))
+    if pit is not None:
+        result["pit_id"] = pit["id"]
+    return JSONResponse(content=result)
+
+
+@app.post("/_search")
+async def search_all(request: Request):
+    return search_response(request, None, await request.json())
+
+
+@app.post("/{index}/_search")
+async def search_index(index: str, request: Request):
+    return search_response(request, index, await request.json())
+
+
+async def msearch_response(request: Request, index: str) -> JSONResponse:
+    stats["msearch"] += 1
+    stats["connections"].add(request.client)
+    if request.headers.get("content-type") != "application/x-ndjson":
+        return error(406, "Content-Type must be application/x-ndjson")
+    lines = (await request.body()).decode().splitlines()
+    if len(lines) % 2:
+        return error(400, "every search needs a header and a body line")
+
+    responses = []
+    for header, body in zip(lines[::2], lines[1::2]):
+        target = json.loads(header).get("index") or index or settings["index"]
+        try:
+            responses.append({**run_search(target, json.loads(body)), "status": 200})
+        except LookupError as e:
+            responses.append({"error": {"type": "index_not_found_exception", "reason": str(e)}, "status": 404})
+    return JSONResponse(content={"took": 1, "responses": responses})
+
+
+@app.post("/_msearch")
+async def msearch_all(request: Request):
+    return await msearch_response(request, None)
+
+
+@app.post("/{index}/_msearch")
+async def msearch_index(index: str, request: Request):
+    return await msearch_response(request, index)
+
+
+@app.post("/{index}/_search/point_in_time")
+async def open_pit(index: str, keep_alive: str = None):
+    if not settings["pit"]:
+        stats["pit_rejected"] += 1
+        return error(400, "request [/_search/point_in_time] contains unrecognized parameter")
+    if index != settings["index"]:
+        return error(404, f"no such index [{index}]")
+    if not keep_alive:
+        return error(400, "keep_alive is required")
+    pit_id = uuid.uuid4().hex
+    pits[pit_id] = index
+    stats["pit_opened"] += 1
+    return {"pit_id": pit_id, "creation_time": 0}
+
+
+@app.delete("/_search/point_in_time")
+async def close_pit(request: Request):
+    body = await request.json()
+    closed = [{"pit_id": pit_id, "successful": pits.pop(pit_id, None) is not None} for pit_id in body.get("pit_id", [])]
+    stats["pit_closed"] += sum(pit["successful"] for pit in closed)
+    return {"pits": closed}
+
+
+@app.get("/stats")
+async def get_stats():
+    return {**stats, "connections": len(stats["connections"]), "open_pits": len(pits), "settings": settings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--index", default=settings["index"])
+    parser.add_argument("--docs", type=int, default=settings["docs"], help="documents in the index")
+    parser.add_argument("--no-pit", action="store_true", help="answer point in time requests with 400")
+    args = parser.parse_args()
+
+    settings.update(index=args.index, docs=args.docs, pit=not args.no_pit)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
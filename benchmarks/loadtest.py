@@ -0,0 +1,214 @@
+"""
+Load test for app.py and main.py.
+
+Drives concurrent requests against the intent manager (/generate/,
+/validate_intent/, /read_intent/) and the multi-intent tools
+(/{tool_type}/{id}/process), and reports throughput and p50/p95/p99
+latency per scenario. Results are written as JSON so runs of different
+versions can be compared with --compare.
+
+With --spawn it starts the fake Ollama server, app.py and main.py by
+itself (LLM cache disabled), so no model is needed:
+
+    python benchmarks/loadtest.py --spawn --requests 200 --concurrency 20 --output results.json
+    python benchmarks/loadtest.py --spawn --compare results.json
+
+--fake-backends N starts N fake servers on consecutive ports and passes
+them as OLLAMA_HOSTS, to measure how throughput scales with the pool.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("generate", "validate", "read", "process")
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# One HTTP request of a scenario; returns True on success
+async def request(scenario: str, client: httpx.AsyncClient, args, i: int) -> bool:
+    if scenario == "generate":
+        response = await client.post(
+            f"{args.app_url}/generate/",
+            data={"intent_name": f"bench_{args.run_id}_{i}", "description": f"benchmark intent {i}", "no_cache": "true"},
+        )
+    elif scenario == "validate":
+        response = await client.get(f"{args.app_url}/validate_intent/", params={"intent_name": args.intent})
+    elif scenario == "read":
+        response = await client.get(f"{args.app_url}/read_intent/", params={"intent_name": args.intent})
+    else:
+        response = await client.post(
+            f"{args.main_url}/{args.tool_type}/{args.tool_id}/process",
+            params={"no_cache": "true"},
+            json={"query": f"benchmark {i}"},
+        )
+    return response.status_code < 400
+
+
+async def run_scenario(scenario: str, args) -> dict:
+    latencies = []
+    errors = 0
+    counter = iter(range(args.requests))
+
+    async def worker(client):
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                ok = await request(scenario, client, args, i)
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p95": percentile(latencies, 0.95) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+            "max": max(latencies, default=0.0) * 1000,
+        },
+    }
+
+
+async def cleanup(args):
+    # Remove the intents created by the generate scenario
+    async with httpx.AsyncClient(timeout=args.timeout) as client:
+        await asyncio.gather(*(
+            client.delete(f"{args.app_url}/delete_intent/", params={"intent_name": f"bench_{args.run_id}_{i}"})
+            for i in range(args.requests)
+        ))
+
+
+def wait_until_up(url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not start")
+
+
+# Start the fake Ollama servers and both apps; returns the processes to stop
+def spawn(args) -> list:
+    ports = [args.fake_port + i for i in range(args.fake_backends)]
+    hosts = ",".join(f"http://127.0.0.1:{port}" for port in ports)
+    env = {**os.environ, "OLLAMA_HOSTS": hosts, "LLM_CACHE": "0"}
+    commands = [
+        [sys.executable, "benchmarks/fake_ollama.py", "--port", str(port),
+         "--ttft", str(args.fake_ttft), "--token-rate", str(args.fake_token_rate)]
+        for port in ports
+    ] + [
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(args.app_url.rsplit(":", 1)[1]), "--log-level", "warning"],
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.main_url.rsplit(":", 1)[1]), "--log-level", "warning"],
+    ]
+    processes = [subprocess.Popen(command, cwd=REPO_DIR, env=env) for command in commands]
+    for url in [f"http://127.0.0.1:{port}/api/tags" for port in ports] + [args.app_url, f"{args.main_url}/tools"]:
+        wait_until_up(url)
+    return processes
+
+
+def print_report(results: dict, baseline: dict = None):
+    print(f"{'scenario':<10} {'reqs':>6} {'errors':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for scenario, result in results["scenarios"].items():
+        latency = result["latency_ms"]
+        print(
+            f"{scenario:<10} {result['requests']:>6} {result['errors']:>6} {result['throughput']:>9.1f} "
+            f"{latency['p50']:>9.1f} {latency['p95']:>9.1f} {latency['p99']:>9.1f}"
+        )
+        previous = (baseline or {}).get("scenarios", {}).get(scenario)
+        if previous:
+            def change(new, old):
+                return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(
+                f"{'  vs base':<10} {'':>6} {'':>6} {change(result['throughput'], previous['throughput']):>9} "
+                f"{change(latency['p50'], previous['latency_ms']['p50']):>9} "
+                f"{change(latency['p95'], previous['latency_ms']['p95']):>9} "
+                f"{change(latency['p99'], previous['latency_ms']['p99']):>9}"
+            )
+
+
+async def main(args):
+    results = {
+        "label": args.label,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "settings": {"requests": args.requests, "concurrency": args.concurrency, "fake_backends": args.fake_backends},
+        "scenarios": {},
+    }
+    try:
+        for scenario in args.scenarios:
+            results["scenarios"][scenario] = await run_scenario(scenario, args)
+    finally:
+        if "generate" in args.scenarios:
+            await cleanup(args)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--main-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--intent", default="newintent.py", help="intent used by the validate and read scenarios")
+    parser.add_argument("--tool-type", default="generic_empty")
+    parser.add_argument("--tool-id", type=int, default=1)
+    parser.add_argument("--label", default="", help="name of this run, stored in the results")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    parser.add_argument("--spawn", action="store_true", help="start the fake Ollama server, app.py and main.py")
+    parser.add_argument("--fake-port", type=int, default=11499)
+    parser.add_argument("--fake-backends", type=int, default=1, help="fake Ollama servers behind the apps")
+    parser.add_argument("--fake-ttft", type=float, default=0.1)
+    parser.add_argument("--fake-token-rate", type=float, default=200.0)
+    args = parser.parse_args()
+    args.run_id = uuid.uuid4().hex[:8]
+
+    processes = spawn(args) if args.spawn else []
+    try:
+        results = asyncio.run(main(args))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,114 @@
+import ast
+import re
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+FENCE_OPEN = "```python"
+FENCE_CLOSE = "\n```"
+
+
+class CodeFenceParser:
+    """
+    Incremental parser of a model's streamed output.
+
+    Feed it the generated text chunk by chunk: it skips <think>...</think>
+    reasoning blocks and captures the first ```python block. `feed()`
+    returns True as soon as that block is closed, so the caller can stop
+    the generation instead of waiting for trailing prose.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.code = None
+        self.done = False
+        self._state = "text"
+        self._pos = 0
+        self._code_start = None
+
+    def feed(self, chunk: str) -> bool:
+        if self.done:
+            return True
+        self.text += chunk
+
+        while True:
+            if self._state == "text":
+                think = self.text.find(THINK_OPEN, self._pos)
+                fence = self.text.find(FENCE_OPEN, self._pos)
+                if think != -1 and (fence == -1 or think < fence):
+                    self._state, self._pos = "think", think + len(THINK_OPEN)
+                elif fence != -1:
+                    # The fence line must be complete before the code starts
+                    newline = self.text.find("\n", fence)
+                    if newline == -1:
+                        return False
+                    # An empty block closes right after the fence line
+                    self._state, self._pos = "code", newline
+                    self._code_start = newline + 1
+                else:
+                    # Markers may be split across chunks: rescan the tail
+                    self._pos = max(self._pos, len(self.text) - len(FENCE_OPEN))
+                    return False
+
+            elif self._state == "think":
+                end = self.text.find(THINK_CLOSE, self._pos)
+                if end == -1:
+                    self._pos = max(self._pos, len(self.text) - len(THINK_CLOSE))
+                    return False
+                self._state, self._pos = "text", end + len(THINK_CLOSE)
+
+            else:
+                end = self.text.find(FENCE_CLOSE, self._pos)
+                if end == -1:
+                    self._pos = max(self._pos, len(self.text) - len(FENCE_CLOSE))
+                    return False
+                self.code = self.text[self._code_start:end].strip()
+                self.done = True
+                return True
+
+
+# Remove <think>...</think> reasoning blocks (and an unterminated one)
+def strip_reasoning(text):
+    return re.sub(r"<think>.*?(</think>|$)", "", text, flags=re.DOTALL)
+
+
+# Function to extract only the code and detect parameters
+def extract_code(text):
+    parser = CodeFenceParser()
+    parser.feed(text)
+    code = parser.code if parser.code is not None else strip_reasoning(text).strip()
+    return code, detect_parameters(code)
+
+
+# Parameters of the functions defined at the top level of the code
+def detect_parameters(code):
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return detect_parameters_regex(code)
+
+    parameters = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            args = node.args
+            for arg in args.posonlyargs + args.args + args.kwonlyargs:
+                if arg.arg not in parameters:
+                    parameters.append(arg.arg)
+    return parameters
+
+
+# Fallback for code that does not parse: find all functions and their parameters
+def detect_parameters_regex(code):
+    param_matches = re.findall(r"def\s+\w+\((.*?)\):", code)
+
+    parameters = set()  # Use a set to avoid duplicates
+    for param_match in param_matches:
+        params = [param.strip().split("=")[0] for param in param_match.split(",") if param]  # Clean up parameters
+        parameters.update(params)
+
+    return list(parameters)
+
+
+# Prompt recorded in the header of a generated intent, if any
+def extract_prompt(code):
+    match = re.match(r"\s*# Prompt (?:used|utilizado): (.*)", code)
+    return match.group(1).strip() if match else None
@@ -1,39 +1,23 @@
+import argparse
+import json
 import os
+import time
+
+from intent_store import IntentStore
+from intent_templates import TemplateEngine, atomic_write, scaffold, syntax_error
 
 # Directory where the intents will be stored
 TOOLS_DIR = "tools"
 
-# Base templates for each type of intent
-TEMPLATES = {
-    "rag_opensearch": """# RAG with OpenSearch
-import httpx
-
-async def process(query: str):
-    url = "http://localhost:9200/_search"
-    response = httpx.get(url, params={"q": query})
-    return response.json()
-""",
-    "nlp_to_sql": """# NLP → SQL
-import sqlite3
-
-def process(query: str):
-    conn = sqlite3.connect("database.db")
-    cursor = conn.cursor()
-    sql_query = f"SELECT * FROM table WHERE column LIKE '%{query}%'"
-    cursor.execute(sql_query)
-    results = cursor.fetchall()
-    conn.close()
-    return results
-""",
-    "generic_empty": """# Generic empty intent
-def process(input_data):
-    return {"message": "Generic intent executed", "input": input_data}
-"""
-}
+# Compiled templates from tool_types.json, shared by every call
+engine = TemplateEngine()
+
+# Versioned intent store; the files in tools/ are its export
+store = IntentStore()
 
 def create_intent(intent_type: str, intent_name: str):
     """Generates an intent file inside the tools/ folder"""
-    if intent_type not in TEMPLATES:
+    if intent_type not in engine.tool_types:
         print(f"⚠️ Intent type '{intent_type}' not recognized.")
         return
     
@@ -42,12 +26,56 @@ def create_intent(intent_type: str, intent_name: str):
     
     # Create file inside tools/
     filename = f"{TOOLS_DIR}/{intent_name}.py"
-    
-    if os.path.exists(filename):
+    code = engine.render(intent_type, intent_name)
+    error = syntax_error(code)
+    if error:
+        print(error)
+        return
+
+    if not atomic_write(filename, code):
         print(f"⚠️ The intent '{intent_name}' already exists.")
         return
-    
-    with open(filename, "w") as f:
-        f.write(TEMPLATES[intent_type])
+
+    store.save(intent_name, code, intent_type, source="create")
     
     print(f"✅ Intent '{intent_name}' generated at {filename}")
+
+
+def create_intents_from_manifest(manifest_path: str, overwrite: bool = False, workers: int = 16):
+    """Generates every intent listed in a JSONL manifest (one JSON object per line)"""
+    with open(manifest_path, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+
+    started = time.perf_counter()
+    results = scaffold(engine, entries, TOOLS_DIR, overwrite=overwrite, workers=workers)
+    store.save_many(
+        ((result["intent_name"], result["code"], result["intent_type"]) for result in results if result["status"] == "created"),
+        source="create",
+    )
+    elapsed = time.perf_counter() - started
+
+    for result in results:
+        if result["status"] == "error":
+            print(f"{result['message']} ({result['intent_name']})")
+
+    created = sum(result["status"] == "created" for result in results)
+    existing = sum(result["status"] == "exists" for result in results)
+    print(f"✅ {created} intents generated, {existing} already existed, in {elapsed:.2f}s")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate intent files inside the tools/ folder")
+    parser.add_argument("intent_type", nargs="?", help=f"one of: {', '.join(engine.tool_types)}")
+    parser.add_argument("intent_name", nargs="?")
+    parser.add_argument("--manifest", help="JSONL file with intent_type, intent_name and optional parameters/description")
+    parser.add_argument("--overwrite", action="store_true", help="replace intents that already exist (manifest only)")
+    parser.add_argument("--workers", type=int, default=16, help="parallel file writes (manifest only)")
+    args = parser.parse_args()
+
+    if args.manifest:
+        create_intents_from_manifest(args.manifest, args.overwrite, args.workers)
+    elif args.intent_type and args.intent_name:
+        create_intent(args.intent_type, args.intent_name)
+    else:
+        parser.error("give an intent type and name, or --manifest")
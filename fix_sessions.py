@@ -0,0 +1,193 @@
+import asyncio
+import difflib
+import hashlib
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from code_extract import extract_code
+
+# Fix session settings, configurable per deployment
+FIX_SESSION_TTL = float(os.getenv("FIX_SESSION_TTL", "1800"))
+FIX_SESSIONS_MAX = int(os.getenv("FIX_SESSIONS_MAX", "100"))
+# Previous rounds (error and fix) resent when the model returned no context
+FIX_SESSION_TURNS = int(os.getenv("FIX_SESSION_TURNS", "3"))
+
+
+def code_key(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def unified_diff(before: str, after: str, old: str = "previous", new: str = "current") -> str:
+    return "\n".join(difflib.unified_diff(before.splitlines(), after.splitlines(), old, new, lineterm="", n=2))
+
+
+# Error of a failed validation as shown to the model (messages already carry the line or traceback)
+def describe_error(result: dict) -> str:
+    return result.get("message", "").removeprefix("⚠️ ")
+
+
+@dataclass
+class FixSession:
+    id: str
+    intent_name: str
+    model: str
+    code: str
+    answer: str = field(default=None, repr=False)
+    context: list = field(default=None, repr=False)
+    turns: list = field(default_factory=list, repr=False)
+    results: dict = field(default_factory=dict, repr=False)
+    iterations: list = field(default_factory=list)
+    created: float = field(default_factory=time.time)
+    updated: float = field(default_factory=time.time)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    def snapshot(self) -> dict:
+        return {
+            "id": self.id,
+            "intent_name": self.intent_name,
+            "model": self.model,
+            "code": self.code,
+            "iterations": self.iterations,
+            "created": self.created,
+            "updated": self.updated,
+        }
+
+
+class FixSessionManager:
+    """
+    Multi-round repair of an intent's code with one model conversation.
+
+    The first round sends the whole code and its validation error. Each
+    following round continues the conversation with the `context`
+    returned by Ollama for the previous answer, so only the new error and
+    a diff of the user's edits since that answer are sent; the model does
+    not re-read the code. When no context is available (e.g. a response
+    without one), the round sends the latest code and error after the
+    last `turns` rounds (each error and the diff of the fix tried for
+    it), so the prompt does not grow with every round.
+
+    Sessions expire after `ttl` seconds without use; at most
+    `max_sessions` are kept (least recently used first out).
+    """
+
+    def __init__(
+        self, client, validator, model: str = None, ttl: float = FIX_SESSION_TTL, max_sessions: int = FIX_SESSIONS_MAX,
+        turns: int = FIX_SESSION_TURNS,
+    ):
+        self.client = client
+        self.validator = validator
+        self.model = model
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.turns = turns
+        self.sessions = OrderedDict()
+
+    def create(self, intent_name: str, code: str, model: str = None) -> FixSession:
+        self._expire()
+        session = FixSession(uuid.uuid4().hex, intent_name, model or self.model or self.client.model, code)
+        self.sessions[session.id] = session
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+        return session
+
+    def get(self, session_id: str):
+        self._expire()
+        session = self.sessions.get(session_id)
+        if session is not None:
+            self.sessions.move_to_end(session_id)
+        return session
+
+    def close(self, session_id: str) -> bool:
+        return self.sessions.pop(session_id, None) is not None
+
+    def _expire(self):
+        now = time.time()
+        for session_id in [key for key, session in self.sessions.items() if now - session.updated > self.ttl]:
+            del self.sessions[session_id]
+
+    async def _validate(self, session: FixSession, code: str) -> dict:
+        key = code_key(code)
+        result = session.results.get(key)
+        if result is None:
+            result = session.results[key] = await self.validator.validate(code, f"<fix {session.intent_name}>")
+        return result
+
+    # Stateless prompt: the whole code and its error
+    def _full_prompt(self, code: str, error: str) -> str:
+        return (
+            "Fix the errors in the following Python code and return only the corrected code, without explanations. "
+            f"When executed it fails with: {error}\n"
+            f"The code to fix is:\n```python\n{code}\n```"
+        )
+
+    # Follow-up in the same conversation: the new error and the user's edits since the last answer
+    def _followup_prompt(self, session: FixSession, code: str, error: str) -> str:
+        prompt = f"Your corrected code still fails with: {error}\n"
+        diff = unified_diff(session.answer, code)
+        if diff:
+            prompt += f"Since your last answer the code was changed as follows:\n```diff\n{diff}\n```\n"
+        return prompt + "Return only the full corrected code within ```python."
+
+    # Without a context: the last rounds, then the latest code and its error
+    def _history_prompt(self, session: FixSession, code: str, error: str) -> str:
+        rounds = "\n\n".join(
+            f"It failed with: {turn['error']}\nThe fix tried was:\n```diff\n{turn['fix']}\n```"
+            for turn in session.turns
+        )
+        return f"Earlier rounds of this repair:\n{rounds}\n\n{self._full_prompt(code, error)}"
+
+    async def iterate(self, session: FixSession, code: str = None, use_cache: bool = True) -> dict:
+        """Run one repair round on `code` (default: the session's last code) and record it."""
+        async with session.lock:
+            code = session.code if code is None else code
+            started = time.perf_counter()
+            result = await self._validate(session, code)
+            iteration = {"iteration": len(session.iterations) + 1}
+
+            if result["status"] == "success":
+                session.code = code
+                iteration.update(status="valid", error=None, message=result["message"], duration=time.perf_counter() - started)
+            else:
+                error = describe_error(result)
+                full_prompt = self._full_prompt(code, error)
+                reuse_context = session.context is not None
+                if reuse_context:
+                    prompt = self._followup_prompt(session, code, error)
+                elif session.turns:
+                    prompt = self._history_prompt(session, code, error)
+                else:
+                    prompt = full_prompt
+
+                generation = await self.client.generate(
+                    prompt, session.model, use_cache=use_cache, context=session.context, coalesce=False
+                )
+                fixed_code, parameters = extract_code(generation.text)
+                if fixed_code.strip():
+                    fixed_result = await self._validate(session, fixed_code)
+                    session.context = generation.context
+                    if self.turns:
+                        turn = {"error": error, "fix": unified_diff(code, fixed_code, "failing", "fixed")}
+                        session.turns = (session.turns + [turn])[-self.turns:]
+                    session.code = session.answer = fixed_code
+                else:
+                    # No code in the answer: a failed round, the session keeps its last code
+                    fixed_result = {"status": "error", "message": "⚠️ The model's answer contains no code."}
+                iteration.update(
+                    status="fixed" if fixed_result["status"] == "success" else "failed",
+                    error=error,
+                    message=fixed_result["message"],
+                    fixed_code=fixed_code,
+                    parameters=parameters,
+                    reused_context=reuse_context,
+                    prompt_chars=len(prompt),
+                    full_prompt_chars=len(full_prompt),
+                    cached=generation.cached,
+                    duration=time.perf_counter() - started,
+                )
+
+            session.iterations.append(iteration)
+            session.updated = time.time()
+            return iteration
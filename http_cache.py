@@ -0,0 +1,146 @@
+import gzip
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # Optional: without it responses are only gzip-compressed
+    brotli = None
+
+# Responses smaller than this are sent as they are
+MINIMUM_SIZE = 500
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript")
+
+
+def negotiate_encoding(accept_encoding: str):
+    """The encoding CompressionMiddleware uses for an Accept-Encoding header (None: identity)."""
+    encodings = {part.split(";")[0].strip() for part in (accept_encoding or "").split(",")}
+    if brotli is not None and "br" in encodings:
+        return "br"
+    if "gzip" in encodings:
+        return "gzip"
+    return None
+
+
+def compressible(media_type: str) -> bool:
+    return (media_type or "").startswith(COMPRESSIBLE_TYPES)
+
+
+# Entity tag of the compressed representation of a response
+def encoded_etag(etag: str, encoding: str) -> str:
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else etag
+
+
+def etag_for(content) -> str:
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+
+
+# Compare entity tags ignoring weakness and the encoding suffix added by CompressionMiddleware
+def _opaque(tag: str) -> str:
+    tag = tag.strip().removeprefix("W/").strip('"')
+    for suffix in ("-br", "-gzip"):
+        tag = tag.removesuffix(suffix)
+    return tag
+
+
+def not_modified(request, etag: str, last_modified: float = None) -> bool:
+    """True when the client's copy (If-None-Match / If-Modified-Since) is still current."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(",")}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def cached_response(request, content, media_type: str, etag: str = None, last_modified: float = None) -> Response:
+    """
+    A response that clients revalidate on every use (Cache-Control:
+    no-cache) and that becomes an empty 304 when their copy is current.
+    The 304 carries the ETag of the representation CompressionMiddleware
+    would have sent for the same request, so caches match it.
+    """
+    etag = etag or etag_for(content)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    if compressible(media_type):
+        headers["Vary"] = "Accept-Encoding"
+
+    if not_modified(request, etag, last_modified):
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        size = len(content.encode("utf-8") if isinstance(content, str) else content)
+        if encoding is not None and compressible(media_type) and size >= MINIMUM_SIZE:
+            headers["ETag"] = encoded_etag(etag, encoding)
+        return Response(status_code=304, headers=headers)
+    return Response(content, media_type=media_type, headers=headers)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing complete text/JSON responses with brotli
+    (when installed and accepted) or gzip. Streaming responses (SSE,
+    NDJSON) are passed through untouched so their chunks are not held
+    back by the compressor. Every text/JSON response gets
+    `Vary: Accept-Encoding`, compressed or not.
+    """
+
+    def __init__(self, app, minimum_size: int = MINIMUM_SIZE, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None:
+                return await send(message)
+
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if compressible(headers.get("content-type")):
+                if "accept-encoding" not in headers.get("vary", "").lower():
+                    headers.add_vary_header("Accept-Encoding")
+                if (
+                    encoding is not None
+                    and not message.get("more_body", False)
+                    and len(body) >= self.minimum_size
+                    and "content-encoding" not in headers
+                ):
+                    body = self._compress(body, encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    etag = headers.get("etag")
+                    if etag:
+                        headers["ETag"] = encoded_etag(etag, encoding)
+                    message = {**message, "body": body}
+
+            await send(start)
+            start = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,218 @@
+import argparse
+import ast
+import asyncio
+import hashlib
+import importlib.util
+import json
+import logging
+import marshal
+import os
+import sys
+import tempfile
+import time
+import zipfile
+import zipimport
+
+from intent_precheck import PreChecker
+from intent_templates import FILE_MODE
+from intent_runtime import find_entry_point, import_code
+
+# Bundle served by the runtime when set (built with `python intent_bundle.py build`)
+INTENT_BUNDLE = os.getenv("INTENT_BUNDLE")
+BUNDLES_DIR = os.getenv("BUNDLES_DIR", "bundles")
+BUNDLE_FORMAT = 1
+MANIFEST = "manifest.json"
+
+logger = logging.getLogger("multiintent.bundle")
+
+
+class IntentBundleError(Exception):
+    """Raised when a bundle cannot be used by this interpreter or lacks an intent."""
+
+
+# Bytecode in .pyc form: unchecked hash-based header (PEP 552), valid whatever the file times
+def pyc_bytes(code, source: bytes) -> bytes:
+    flags = 0b01
+    return importlib.util.MAGIC_NUMBER + flags.to_bytes(4, "little") + importlib.util.source_hash(source) + marshal.dumps(code)
+
+
+# Module name of an intent inside the bundle (file names may contain spaces)
+def module_name(sha256: str) -> str:
+    return f"intent_{sha256[:16]}"
+
+
+def describe(info) -> dict:
+    """Manifest entry of an intent: content hash, functions and entry point read from the AST."""
+    tree = ast.parse(info.code, info.path)
+    functions = {
+        node.name: [arg.arg for arg in node.args.posonlyargs + node.args.args + node.args.kwonlyargs]
+        for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and not node.name.startswith("_")
+    }
+    entry_point = find_entry_point(functions)
+    return {
+        "module": module_name(info.sha256),
+        "sha256": info.sha256,
+        "path": info.path,
+        "size": info.size,
+        "prompt": info.prompt,
+        "parameters": info.parameters,
+        "functions": sorted(functions),
+        "entry_point": entry_point,
+        "arguments": functions.get(entry_point, []),
+    }
+
+
+async def _sandbox_results(intents: list) -> list:
+    from sandbox import ValidationPool
+
+    validator = ValidationPool()
+    validator.start()
+    try:
+        return await validator.validate_many((info.code, info.path) for info in intents)
+    finally:
+        validator.close()
+
+
+def build_bundle(intents, output: str = None, sandbox: bool = False) -> dict:
+    """
+    Compile every valid intent (IntentInfo objects) into a bundle: a zip
+    of .pyc files plus a manifest with entry points, parameters and
+    content hashes. Intents are validated with the static pre-check, and
+    also in the sandbox with `sandbox=True`. Returns the manifest.
+    """
+    intents = sorted(intents, key=lambda info: info.name)
+    checker = PreChecker()
+    results = [checker.check(info.code, info.path) for info in intents]
+    if sandbox:
+        passed = [info for info, result in zip(intents, results) if result["status"] == "success"]
+        executed = dict(zip((info.name for info in passed), asyncio.run(_sandbox_results(passed))))
+        results = [executed.get(info.name, result) for info, result in zip(intents, results)]
+
+    entries, skipped, modules = {}, {}, {}
+    for info, result in zip(intents, results):
+        if result["status"] != "success":
+            skipped[info.name] = result["message"]
+            continue
+        entry = entries[info.name] = describe(info)
+        if entry["module"] not in modules:
+            source = info.code.encode("utf-8")
+            modules[entry["module"]] = pyc_bytes(compile(source, info.path, "exec", dont_inherit=True), source)
+
+    validation = "sandbox" if sandbox else "precheck"
+    version = hashlib.sha256(
+        json.dumps([validation, sorted((name, entry["sha256"]) for name, entry in entries.items())]).encode("utf-8")
+    ).hexdigest()[:16]
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "version": version,
+        "created": time.time(),
+        "python": sys.version.split()[0],
+        "magic": importlib.util.MAGIC_NUMBER.hex(),
+        "validation": validation,
+        "intents": entries,
+        "skipped": skipped,
+    }
+
+    output = output or os.path.join(BUNDLES_DIR, f"intents-{version}.zip")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output) or ".", suffix=".tmp")
+    try:
+        os.fchmod(fd, FILE_MODE)
+        with os.fdopen(fd, "wb") as f, zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as bundle:
+            bundle.writestr(MANIFEST, json.dumps(manifest, ensure_ascii=False, indent=1))
+            for module, data in modules.items():
+                bundle.writestr(f"{module}.pyc", data)
+        os.replace(tmp_path, output)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    manifest["path"] = output
+    return manifest
+
+
+class IntentBundle:
+    """
+    Read-only view of a built bundle.
+
+    Opening it reads only the zip directory and the manifest; an intent's
+    bytecode is read through zipimport when the intent is loaded.
+    IntentRuntime uses it for intents whose hash matches, which saves the
+    compile and, for sandbox-validated bundles, the sandbox run on each
+    intent's first call. The registry still scans tools/ at startup.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._importer = zipimport.zipimporter(path)
+        self.manifest = json.loads(self._importer.get_data(MANIFEST))
+        if self.manifest.get("format") != BUNDLE_FORMAT:
+            raise IntentBundleError(f"⚠️ Unsupported bundle format in '{path}'.")
+        if self.manifest["magic"] != importlib.util.MAGIC_NUMBER.hex():
+            raise IntentBundleError(
+                f"⚠️ Bundle '{path}' was built with Python {self.manifest['python']}; rebuild it for this interpreter."
+            )
+        self.intents = self.manifest["intents"]
+        self.version = self.manifest["version"]
+        self.validation = self.manifest["validation"]
+        self.loaded = {}
+
+    def names(self) -> list:
+        return sorted(self.intents)
+
+    def get(self, intent_name: str):
+        return self.intents.get(intent_name)
+
+    def has(self, intent_name: str, sha256: str = None) -> bool:
+        entry = self.intents.get(intent_name)
+        return entry is not None and (sha256 is None or entry["sha256"] == sha256)
+
+    def load(self, intent_name: str):
+        """Import one intent from its precompiled code (cached)."""
+        loaded = self.loaded.get(intent_name)
+        if loaded is None:
+            entry = self.intents.get(intent_name)
+            if entry is None:
+                raise IntentBundleError(f"⚠️ Intent '{intent_name}' is not in bundle {self.version}.")
+            code = self._importer.get_code(entry["module"])
+            loaded = self.loaded[intent_name] = import_code(intent_name, entry["sha256"], entry["path"], code)
+        return loaded
+
+
+# The bundle in INTENT_BUNDLE, or None (logged) when it is missing or was built for another Python
+def open_bundle(path: str = INTENT_BUNDLE):
+    if not path:
+        return None
+    try:
+        return IntentBundle(path)
+    except (OSError, zipimport.ZipImportError, IntentBundleError) as e:
+        logger.warning("Intent bundle not used: %s", e)
+        return None
+
+
+if __name__ == "__main__":
+    from intent_registry import IntentRegistry
+
+    parser = argparse.ArgumentParser(description="Build or inspect a precompiled intent bundle")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build = subcommands.add_parser("build", help="compile the valid intents of a tools dir into a bundle")
+    build.add_argument("tools_dir", nargs="?", default="tools")
+    build.add_argument("--output", help=f"bundle path (default: {BUNDLES_DIR}/intents-<version>.zip)")
+    build.add_argument("--sandbox", action="store_true", help="also validate by executing in the sandbox")
+    info = subcommands.add_parser("info", help="show the manifest of a bundle")
+    info.add_argument("bundle")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        registry = IntentRegistry(args.tools_dir)
+        registry.load()
+        manifest = build_bundle(registry.intents.values(), args.output, args.sandbox)
+        print(f"✅ Bundle {manifest['version']}: {len(manifest['intents'])} intents in {manifest['path']}")
+        for name, message in manifest["skipped"].items():
+            print(f"⚠️ Skipped {name}: {message.removeprefix('⚠️ ')}")
+    else:
+        bundle = IntentBundle(args.bundle)
+        print(json.dumps({key: value for key, value in bundle.manifest.items() if key != "intents"}, indent=2, ensure_ascii=False))
+        for name in bundle.names():
+            entry = bundle.get(name)
+            print(f"{name}: {entry['entry_point']}({', '.join(entry['arguments'])}) {entry['sha256'][:12]}")
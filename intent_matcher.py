@@ -0,0 +1,87 @@
+import re
+from collections import deque
+
+# Text is matched word by word, case-insensitively
+WORD_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list:
+    return WORD_RE.findall(text.lower())
+
+
+class IntentMatcher:
+    """
+    Multi-intent keyword matcher.
+
+    Compiles an {intent: [keyword or phrase, ...]} dictionary into a
+    single Aho-Corasick automaton over words, so every keyword and
+    multi-word phrase (n-gram) of every intent is found in one linear pass
+    over the text, whatever the number of intents and keywords. Build it
+    once (e.g. at module level) and reuse it for every call.
+    """
+
+    def __init__(self, intents: dict):
+        self.intents = list(intents)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+        for intent, keywords in intents.items():
+            for keyword in keywords:
+                self._add(tokenize(keyword), intent, keyword)
+        self._link()
+
+    def _add(self, words: list, intent: str, keyword: str):
+        if not words:
+            return
+        node = 0
+        for word in words:
+            next_node = self._goto[node].get(word)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][word] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            node = next_node
+        self._output[node] += ((intent, keyword),)
+
+    # Breadth-first construction of the failure links
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for word, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(word, 0)
+                self._output[child] += self._output[self._fail[child]]
+
+    def match(self, text: str) -> dict:
+        """Return {intent: [matched keywords, in order of appearance]}."""
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = {}
+        node = 0
+        for word in tokenize(text):
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+            for intent, keyword in output[node]:
+                matches.setdefault(intent, []).append(keyword)
+        return matches
+
+    def detect(self, text: str) -> list:
+        """Intents present in the text, in order of first appearance."""
+        return list(self.match(text))
+
+    def score(self, text: str) -> dict:
+        """Number of keyword hits per intent."""
+        return {intent: len(keywords) for intent, keywords in self.match(text).items()}
+
+    def match_batch(self, texts) -> list:
+        return [self.match(text) for text in texts]
+
+    def score_batch(self, texts) -> list:
+        return [self.score(text) for text in texts]
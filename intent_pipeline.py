@@ -0,0 +1,184 @@
+import ast
+import asyncio
+import os
+import time
+
+from code_extract import CodeFenceParser, extract_code
+from fix_sessions import code_key
+from llm_pool import OllamaBusy
+
+# Pipeline settings, configurable per deployment
+PIPELINE_TEMPERATURES = [float(t) for t in os.getenv("PIPELINE_TEMPERATURES", "0.2,0.5,0.8").split(",")]
+PIPELINE_BUDGET = float(os.getenv("PIPELINE_BUDGET", "120"))
+PIPELINE_FIX_ROUNDS = int(os.getenv("PIPELINE_FIX_ROUNDS", "2"))
+
+
+# How close a failed candidate is to working: code that runs until a runtime error beats code that does not parse
+def candidate_rank(candidate: dict) -> int:
+    result = candidate.get("result")
+    if result is None:
+        return 0
+    if result["status"] == "success":
+        return 4
+    return {"SyntaxError": 1, "ImportError": 2, "ModuleNotFoundError": 2}.get(result.get("error_type"), 3)
+
+
+class IntentPipeline:
+    """
+    Server-side generate -> validate -> fix loop.
+
+    K candidates are sampled concurrently from the first model tier of the
+    intent type, one per temperature. Each is validated in the sandbox as
+    soon as its code block closes; the first valid one wins and the other
+    generations are cancelled (closing their streams aborts them in
+    Ollama). If none is valid, the closest one goes through fix-session
+    rounds. Everything runs within `budget` seconds.
+    """
+
+    def __init__(
+        self,
+        client,
+        validator,
+        cascade,
+        fix_sessions,
+        temperatures: list = None,
+        budget: float = PIPELINE_BUDGET,
+        fix_rounds: int = PIPELINE_FIX_ROUNDS,
+    ):
+        self.client = client
+        self.validator = validator
+        self.cascade = cascade
+        self.fix_sessions = fix_sessions
+        self.temperatures = temperatures or PIPELINE_TEMPERATURES
+        self.budget = budget
+        self.fix_rounds = fix_rounds
+
+    async def _candidate(self, index: int, prompt: str, model: str, options: dict, use_cache: bool) -> dict:
+        started = time.perf_counter()
+        candidate = {"candidate": index, "model": model, "temperature": options.get("temperature")}
+        generation = await self.client.generate(
+            prompt, model, options, coalesce=False, use_cache=use_cache, stop=CodeFenceParser().feed
+        )
+        code, _ = extract_code(generation.text)
+        # An empty block is no candidate: it would validate (and win) as a tool that does nothing
+        code = code if code.strip() else ""
+        candidate["code"] = code
+        if code:
+            try:
+                ast.parse(code)
+            except SyntaxError as e:
+                candidate["result"] = {
+                    "status": "error",
+                    "error_type": "SyntaxError",
+                    "lineno": e.lineno,
+                    "message": f"⚠️ Syntax error on line {e.lineno}: {e.msg}",
+                }
+            else:
+                candidate["result"] = await self.validator.validate(code, f"<candidate {index}>")
+        candidate["duration"] = time.perf_counter() - started
+        return candidate
+
+    async def _sample(self, prompt: str, intent_type: str, use_cache: bool, deadline: float) -> tuple:
+        tier = self.cascade.tiers_for(intent_type)[0]
+        # Recorded up front so that failed and cancelled samples are described too
+        samples = [
+            {"candidate": index, "model": tier.model, "temperature": temperature}
+            for index, temperature in enumerate(self.temperatures)
+        ]
+        tasks = [
+            asyncio.ensure_future(self._candidate(
+                index, prompt, tier.model, {**tier.options, "temperature": temperature, "seed": index}, use_cache
+            ))
+            for index, temperature in enumerate(self.temperatures)
+        ]
+        candidates, winner = [], None
+        try:
+            pending = set(tasks)
+            while pending and winner is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is not None:
+                        candidate = {**samples[tasks.index(task)], "error": str(error)}
+                        if isinstance(error, OllamaBusy):
+                            candidate["busy"] = error
+                        candidates.append(candidate)
+                        continue
+                    candidate = task.result()
+                    candidates.append(candidate)
+                    if winner is None and candidate_rank(candidate) == 4:
+                        winner = candidate
+        finally:
+            # First valid wins: stop the generations still running
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finished = {candidate["candidate"] for candidate in candidates}
+        candidates += [{**sample, "cancelled": True} for sample in samples if sample["candidate"] not in finished]
+        return winner, candidates
+
+    async def run(self, intent_name: str, prompt: str, intent_type: str = "generated", use_cache: bool = True) -> dict:
+        """Return a report with the final `code`, its `status` (valid, invalid or timeout) and every step taken."""
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.budget
+        winner, candidates = await self._sample(prompt, intent_type, use_cache, deadline)
+        busy = [c["busy"] for c in candidates if c.get("busy")]
+        if busy and len(busy) == len(candidates):
+            # No candidate got a slot: let the caller answer 429
+            raise busy[0]
+
+        report = {
+            "status": "valid" if winner else "invalid",
+            "code": winner["code"] if winner else None,
+            "model": winner["model"] if winner else None,
+            "candidates": [_summary(candidate) for candidate in sorted(candidates, key=lambda c: c["candidate"])],
+            "fix_rounds": [],
+        }
+
+        best = max((c for c in candidates if c.get("code")), key=candidate_rank, default=None)
+        if winner is None and best is not None:
+            report.update(code=best["code"], model=best["model"])
+            session = self.fix_sessions.create(intent_name, best["code"])
+            session.results[code_key(best["code"])] = best["result"]
+            try:
+                for _ in range(self.fix_rounds):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    iteration = await asyncio.wait_for(self.fix_sessions.iterate(session, use_cache=use_cache), remaining)
+                    report["fix_rounds"].append({key: value for key, value in iteration.items() if key != "fixed_code"})
+                    report.update(code=session.code, model=session.model)
+                    if iteration["status"] in ("fixed", "valid"):
+                        report["status"] = "valid"
+                        break
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self.fix_sessions.close(session.id)
+
+        if report["status"] != "valid" and time.monotonic() >= deadline:
+            report["status"] = "timeout"
+        report["duration"] = time.perf_counter() - started
+        return report
+
+
+def _summary(candidate: dict) -> dict:
+    if candidate.get("cancelled"):
+        status, message = "cancelled", None
+    elif candidate.get("error"):
+        status, message = "error", candidate["error"]
+    elif candidate.get("result"):
+        status, message = candidate["result"]["status"], candidate["result"]["message"]
+    else:
+        status, message = "error", "⚠️ No valid code was generated."
+    return {
+        "candidate": candidate["candidate"],
+        "model": candidate["model"],
+        "temperature": candidate["temperature"],
+        "status": status,
+        "message": message,
+        "duration": candidate.get("duration"),
+    }
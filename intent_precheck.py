@@ -0,0 +1,318 @@
+import ast
+import hashlib
+import importlib.util
+import os
+import pkgutil
+import sys
+import time
+from collections import OrderedDict
+
+from metrics import REGISTRY
+
+# Pre-check settings, configurable per deployment
+PRECHECK_REFRESH_INTERVAL = float(os.getenv("PRECHECK_REFRESH_INTERVAL", "2"))
+PRECHECK_CACHE_SIZE = int(os.getenv("PRECHECK_CACHE_SIZE", "1024"))
+
+# Distribution to install when it is not named like the module it provides
+PIP_NAMES = {
+    "bs4": "beautifulsoup4",
+    "cv2": "opencv-python",
+    "dotenv": "python-dotenv",
+    "multipart": "python-multipart",
+    "opensearchpy": "opensearch-py",
+    "PIL": "Pillow",
+    "sklearn": "scikit-learn",
+    "yaml": "PyYAML",
+}
+
+# Calls that wait on the terminal
+BLOCKING_CALLS = {"input", "getpass.getpass", "sys.stdin.read", "sys.stdin.readline", "sys.stdin.readlines"}
+
+# Calls that open a connection or send a request
+NETWORK_CALLS = {
+    "aiohttp.request",
+    "ftplib.FTP",
+    "ftplib.FTP_TLS",
+    "smtplib.SMTP",
+    "smtplib.SMTP_SSL",
+    "socket.create_connection",
+    "socket.gethostbyname",
+    "socket.getaddrinfo",
+    "urllib.request.urlopen",
+    "urllib.request.urlretrieve",
+    "urllib3.request",
+    "websocket.create_connection",
+    *(f"{module}.{method}" for module in ("requests", "httpx") for method in (
+        "get", "post", "put", "patch", "delete", "head", "options", "request", "stream"
+    )),
+    *(f"ollama.{method}" for method in ("generate", "chat", "embed", "embeddings", "pull", "list", "show", "ps")),
+}
+
+PRECHECKS = REGISTRY.counter("intent_precheck_total", "Static pre-checks of intent code by outcome.", ("outcome",))
+
+
+def install_hint(module: str) -> str:
+    return f"Install it with 'pip install {PIP_NAMES.get(module, module)}'."
+
+
+class ModuleIndex:
+    """
+    Names of the importable top-level modules.
+
+    Built from the builtin and standard library modules plus one listing
+    (pkgutil) of every sys.path entry, so a lookup is a set membership
+    test. The directories are re-checked at most every
+    `refresh_interval` seconds and the index is rebuilt when one of them
+    changed (e.g. a `pip install` into site-packages). A name missing from
+    the listing is confirmed with importlib (path hooks, editable
+    installs) before it is reported.
+    """
+
+    def __init__(self, refresh_interval: float = PRECHECK_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.modules = frozenset()
+        self.built = None
+        self._mtimes = None
+        self._checked = 0.0
+        self._confirmed = {}
+
+    @staticmethod
+    def _paths() -> list:
+        return [os.path.abspath(path or os.getcwd()) for path in sys.path]
+
+    @staticmethod
+    def _mtime(path: str):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def build(self):
+        paths = self._paths()
+        mtimes = {path: self._mtime(path) for path in paths}
+        modules = set(sys.builtin_module_names) | set(sys.stdlib_module_names)
+        for path in paths:
+            if mtimes[path] is None:
+                continue
+            modules.update(module.name for module in pkgutil.iter_modules([path]))
+            if os.path.isdir(path):
+                # Directories without __init__.py are importable as namespace packages
+                with os.scandir(path) as entries:
+                    modules.update(entry.name for entry in entries if entry.name.isidentifier() and entry.is_dir())
+        self.modules = frozenset(modules)
+        self._mtimes = mtimes
+        self._confirmed = {}
+        self.built = time.time()
+
+    def refresh(self):
+        """Rebuild the index if a sys.path directory changed since the last build."""
+        now = time.monotonic()
+        if self._mtimes is not None and now - self._checked < self.refresh_interval:
+            return
+        self._checked = now
+        paths = self._paths()
+        if self._mtimes is None or list(self._mtimes) != paths or any(
+            self._mtime(path) != mtime for path, mtime in self._mtimes.items()
+        ):
+            self.build()
+
+    def __contains__(self, module: str) -> bool:
+        self.refresh()
+        if module in self.modules:
+            return True
+        found = self._confirmed.get(module)
+        if found is None:
+            try:
+                found = self._confirmed[module] = importlib.util.find_spec(module) is not None
+            except (ImportError, ValueError):
+                found = self._confirmed[module] = False
+        return found
+
+    def snapshot(self) -> dict:
+        return {"modules": len(self.modules), "paths": len(self._mtimes or ()), "built": self.built}
+
+
+class _Checker(ast.NodeVisitor):
+    """Collects diagnostics in one walk, tracking whether code runs at import time."""
+
+    def __init__(self, modules: ModuleIndex):
+        self.modules = modules
+        self.diagnostics = []
+        self.aliases = {}
+        self.top_level = True
+        self.guarded = False
+
+    def add(self, node, code: str, severity: str, message: str, **details):
+        self.diagnostics.append({
+            "code": code,
+            "severity": severity,
+            "lineno": node.lineno,
+            "col": node.col_offset,
+            "message": message,
+            **details,
+        })
+
+    # Code in functions runs only when called: its findings are warnings
+    def _nested(self, node):
+        top_level, self.top_level = self.top_level, False
+        self.generic_visit(node)
+        self.top_level = top_level
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_Lambda = _nested
+
+    def visit_If(self, node):
+        # `if __name__ == "__main__":` does not run when the intent is imported
+        test = node.test
+        is_main = (
+            isinstance(test, ast.Compare) and isinstance(test.left, ast.Name) and test.left.id == "__name__"
+            and any(isinstance(c, ast.Constant) and c.value == "__main__" for c in test.comparators)
+        )
+        if not is_main:
+            return self.generic_visit(node)
+        self.visit(node.test)
+        top_level, self.top_level = self.top_level, False
+        for child in node.body:
+            self.visit(child)
+        self.top_level = top_level
+        for child in node.orelse:
+            self.visit(child)
+
+    def visit_Try(self, node):
+        # Imports guarded by `except ImportError` are optional dependencies
+        handled = {
+            name.id if isinstance(name, ast.Name) else getattr(name, "attr", None)
+            for handler in node.handlers
+            for name in ([handler.type] if not isinstance(handler.type, ast.Tuple) else handler.type.elts)
+            if name is not None
+        }
+        guards = not handled.isdisjoint({"ImportError", "ModuleNotFoundError", "Exception", "BaseException"}) or any(
+            handler.type is None for handler in node.handlers
+        )
+        guarded, self.guarded = self.guarded, self.guarded or guards
+        for child in node.body:
+            self.visit(child)
+        self.guarded = guarded
+        for child in node.handlers + node.orelse + node.finalbody:
+            self.visit(child)
+
+    visit_TryStar = visit_Try
+
+    def _check_module(self, node, module: str):
+        top = module.split(".")[0]
+        if self.guarded or top in self.modules:
+            return
+        severity = "error" if self.top_level else "warning"
+        self.add(
+            node, "missing-module", severity,
+            f"Module '{top}' is not installed (line {node.lineno}). {install_hint(top)}", module=top,
+        )
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self._check_module(node, alias.name)
+            if alias.asname:
+                self.aliases[alias.asname] = alias.name
+            else:
+                top = alias.name.split(".")[0]
+                self.aliases[top] = top
+
+    def visit_ImportFrom(self, node):
+        if node.level or not node.module:
+            return  # Relative imports depend on the package the intent is loaded from
+        self._check_module(node, node.module)
+        for alias in node.names:
+            self.aliases[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+
+    # Fully qualified name of a call target, following the import aliases
+    def _qualified(self, func):
+        parts = []
+        while isinstance(func, ast.Attribute):
+            parts.append(func.attr)
+            func = func.value
+        if not isinstance(func, ast.Name):
+            return None
+        parts.append(self.aliases.get(func.id, func.id))
+        return ".".join(reversed(parts))
+
+    def visit_Call(self, node):
+        name = self._qualified(node.func)
+        if name in BLOCKING_CALLS:
+            self.add(
+                node, "blocking-call", "error" if self.top_level else "warning",
+                f"'{name}()' waits for terminal input (line {node.lineno}); intents must take it as a parameter.",
+                call=name,
+            )
+        elif name in NETWORK_CALLS and self.top_level:
+            self.add(
+                node, "network-io", "error",
+                f"Network call '{name}()' at import time (line {node.lineno}); move it into a function.",
+                call=name,
+            )
+        self.generic_visit(node)
+
+
+class PreChecker:
+    """
+    Static pre-check of intent code, run before the execution sandbox.
+
+    Parses the code once and reports, without executing it: syntax
+    errors, imports that cannot be resolved against the ModuleIndex,
+    calls blocking on input() and network I/O at import time. Findings in
+    code that only runs when a function is called are warnings; errors
+    mean the sandbox would fail (or hang) on the code. Results are cached
+    by code hash.
+    """
+
+    def __init__(self, modules: ModuleIndex = None, cache_size: int = PRECHECK_CACHE_SIZE):
+        self.modules = modules or ModuleIndex()
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def check(self, code: str, filename: str = "<intent>") -> dict:
+        """Return {status, message, error_type, lineno, diagnostics, duration}."""
+        started = time.perf_counter()
+        self.modules.refresh()
+        key = (hashlib.sha256(code.encode("utf-8")).digest(), self.modules.built)
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+            PRECHECKS.inc(outcome="cached")
+            return {**result, "duration": time.perf_counter() - started}
+
+        result = self._check(code, filename)
+        self._cache[key] = result
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        PRECHECKS.inc(outcome=result["status"])
+        return {**result, "duration": time.perf_counter() - started}
+
+    def _check(self, code: str, filename: str) -> dict:
+        try:
+            tree = ast.parse(code, filename)
+        except SyntaxError as e:
+            return {
+                "status": "error",
+                "error_type": "SyntaxError",
+                "lineno": e.lineno,
+                "message": f"⚠️ Syntax error on line {e.lineno}: {e.msg}",
+                "diagnostics": [{
+                    "code": "syntax-error", "severity": "error", "lineno": e.lineno, "col": e.offset, "message": e.msg,
+                }],
+            }
+
+        checker = _Checker(self.modules)
+        checker.visit(tree)
+        diagnostics = sorted(checker.diagnostics, key=lambda d: (d["lineno"], d["col"]))
+        errors = [d for d in diagnostics if d["severity"] == "error"]
+        if not errors:
+            return {"status": "success", "message": "✅ The static pre-check passed.", "diagnostics": diagnostics}
+
+        first = errors[0]
+        error_type = {"missing-module": "ModuleNotFoundError", "blocking-call": "BlockingCall"}.get(first["code"], "NetworkIO")
+        return {
+            "status": "error",
+            "error_type": error_type,
+            "lineno": first["lineno"],
+            "message": "⚠️ " + " ".join(d["message"] for d in errors),
+            "diagnostics": diagnostics,
+        }
@@ -0,0 +1,126 @@
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass, field
+
+from watchfiles import awatch
+
+from code_extract import detect_parameters, extract_prompt
+
+
+# Intent names are accepted with or without the .py extension
+def intent_filename(intent_name: str) -> str:
+    return intent_name if intent_name.endswith(".py") else f"{intent_name}.py"
+
+
+@dataclass
+class IntentInfo:
+    name: str
+    path: str
+    size: int
+    mtime: float
+    sha256: str
+    code: str
+    prompt: str = None
+    parameters: list = field(default_factory=list)
+
+
+class IntentRegistry:
+    """
+    In-memory index of the intents stored in `tools_dir`.
+
+    The directory is scanned once by `load()`; afterwards the index is
+    kept current by the endpoints that write files (`refresh`/`remove`)
+    and by a `watchfiles` watcher for changes made outside the app.
+    Listings and lookups never touch the filesystem.
+    """
+
+    def __init__(self, tools_dir: str):
+        self.tools_dir = tools_dir
+        self.intents = {}
+        self.listeners = []
+        self._names = None
+        self._stop = None
+        self._task = None
+
+    def load(self):
+        os.makedirs(self.tools_dir, exist_ok=True)
+        self.intents = {}
+        with os.scandir(self.tools_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".py") and entry.is_file():
+                    self.intents[entry.name] = self._read(entry.name)
+        self._names = None
+
+    def _read(self, name: str) -> IntentInfo:
+        path = os.path.join(self.tools_dir, name)
+        with open(path, "rb") as f:
+            data = f.read()
+        stat = os.stat(path)
+        code = data.decode("utf-8", errors="replace")
+        return IntentInfo(
+            name=name,
+            path=path,
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            sha256=hashlib.sha256(data).hexdigest(),
+            code=code,
+            prompt=extract_prompt(code),
+            parameters=detect_parameters(code),
+        )
+
+    def get(self, intent_name: str):
+        return self.intents.get(intent_filename(intent_name))
+
+    def names(self) -> list:
+        if self._names is None:
+            self._names = sorted(self.intents)
+        return self._names
+
+    def refresh(self, intent_name: str):
+        """Re-read one intent from disk (or drop it if the file is gone)."""
+        name = intent_filename(intent_name)
+        try:
+            info = self._read(name)
+        except FileNotFoundError:
+            return self.remove(name)
+
+        previous = self.intents.get(name)
+        self.intents[name] = info
+        if previous is None:
+            self._names = None
+        if previous is None or previous.sha256 != info.sha256:
+            self._notify(name, info)
+        return info
+
+    def remove(self, intent_name: str):
+        name = intent_filename(intent_name)
+        if self.intents.pop(name, None) is not None:
+            self._names = None
+            self._notify(name, None)
+
+    # Callbacks receive (name, IntentInfo) on changes and (name, None) on removal
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def _notify(self, name: str, info):
+        for callback in self.listeners:
+            callback(name, info)
+
+    async def watch(self):
+        async for changes in awatch(self.tools_dir, stop_event=self._stop, recursive=False):
+            for _, path in changes:
+                name = os.path.basename(path)
+                if name.endswith(".py"):
+                    self.refresh(name)
+
+    def start(self):
+        self.load()
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self.watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._stop.set()
+            await self._task
+            self._task = None
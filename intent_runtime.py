@@ -0,0 +1,137 @@
+import asyncio
+import inspect
+import types
+from dataclasses import dataclass, field
+
+from metrics import span
+
+# Conventional entry points of generated intents, in order of preference
+ENTRY_POINTS = ("process", "run", "get_documents", "find_intents", "get_intents", "get_data")
+
+
+class IntentRuntimeError(Exception):
+    """Raised when an intent cannot be loaded or has no usable entry point."""
+
+
+def find_entry_point(functions) -> str:
+    for name in ENTRY_POINTS:
+        if name in functions:
+            return name
+    # A tool that defines a single function exposes that one
+    if len(functions) == 1:
+        return next(iter(functions))
+    return None
+
+
+@dataclass
+class LoadedIntent:
+    name: str
+    sha256: str
+    code: types.CodeType
+    module: types.ModuleType
+    functions: dict = field(default_factory=dict)
+
+    @property
+    def entry_point(self):
+        return find_entry_point(self.functions)
+
+
+# Import compiled intent code as a fresh module and collect its public functions
+def import_code(name: str, sha256: str, path: str, code: types.CodeType) -> LoadedIntent:
+    module = types.ModuleType(f"intents.{name[:-3]}")
+    module.__file__ = path
+    exec(code, module.__dict__)
+
+    functions = {
+        attr: obj
+        for attr, obj in vars(module).items()
+        if inspect.isfunction(obj) and obj.__module__ == module.__name__ and not attr.startswith("_")
+    }
+    return LoadedIntent(name, sha256, code, module, functions)
+
+
+async def call_function(loaded: LoadedIntent, function: str = None, args: list = None, kwargs: dict = None):
+    """Run `function` (default: the entry point) of a loaded intent; sync functions run in a thread."""
+    function = function or loaded.entry_point
+    if function is None:
+        raise IntentRuntimeError(f"⚠️ Intent '{loaded.name}' has no entry point ({', '.join(ENTRY_POINTS)}).")
+    if function not in loaded.functions:
+        raise IntentRuntimeError(f"⚠️ Intent '{loaded.name}' has no function '{function}'.")
+
+    target = loaded.functions[function]
+    with span("intent_call", intent=loaded.name, function=function):
+        if inspect.iscoroutinefunction(target):
+            result = await target(*(args or []), **(kwargs or {}))
+        else:
+            result = await asyncio.to_thread(target, *(args or []), **(kwargs or {}))
+    return function, result
+
+
+class IntentRuntime:
+    """
+    Executes intents from already-imported modules.
+
+    Each intent is compiled and imported once, then cached by content
+    hash; calls dispatch straight to the cached function. When the
+    registry reports that an intent changed or was deleted only that
+    module is dropped, and it is reloaded on its next call. Code is
+    imported only after it has passed sandbox validation, and sync
+    entry points run in a worker thread.
+
+    With a `bundle` (see intent_bundle), intents whose content hash
+    matches the bundle are loaded from its precompiled code instead of
+    being compiled, and those validated in the sandbox at build time are
+    not validated again.
+    """
+
+    def __init__(self, registry, validator, bundle=None):
+        self.registry = registry
+        self.validator = validator
+        self.bundle = bundle
+        self.loaded = {}
+        # Content hash of each intent's last successful validation
+        self.validated = {}
+        self._locks = {}
+        registry.add_listener(self._on_change)
+
+    def _on_change(self, name: str, info):
+        self.loaded.pop(name, None)
+        self.validated.pop(name, None)
+
+    async def load(self, intent_name: str) -> LoadedIntent:
+        info = self.registry.get(intent_name)
+        if info is None:
+            raise KeyError(intent_name)
+
+        loaded = self.loaded.get(info.name)
+        if loaded is not None and loaded.sha256 == info.sha256:
+            return loaded
+
+        lock = self._locks.setdefault(info.name, asyncio.Lock())
+        async with lock:
+            loaded = self.loaded.get(info.name)
+            if loaded is not None and loaded.sha256 == info.sha256:
+                return loaded
+
+            bundled = self.bundle is not None and self.bundle.has(info.name, info.sha256)
+
+            # Never import code that has not run cleanly in the sandbox. Only
+            # successes are kept: a Timeout or WorkerCrash is retried next call
+            if self.validated.get(info.name) != info.sha256 and not (bundled and self.bundle.validation == "sandbox"):
+                result = await self.validator.validate(info.code, info.path)
+                if result["status"] != "success":
+                    raise IntentRuntimeError(result["message"])
+                self.validated[info.name] = info.sha256
+
+            with span("intent_import", intent=info.name, bundled=bundled):
+                loaded = await asyncio.to_thread(self._import, info, bundled)
+            self.loaded[info.name] = loaded
+            return loaded
+
+    def _import(self, info, bundled: bool = False) -> LoadedIntent:
+        if bundled:
+            return self.bundle.load(info.name)
+        return import_code(info.name, info.sha256, info.path, compile(info.code, info.path, "exec"))
+
+    async def call(self, intent_name: str, function: str = None, args: list = None, kwargs: dict = None):
+        return await call_function(await self.load(intent_name), function, args, kwargs)
@@ -0,0 +1,358 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from code_extract import detect_parameters, extract_prompt
+from intent_registry import intent_filename
+from intent_templates import atomic_write
+
+# Intent store settings, configurable per deployment
+STORE_PATH = os.getenv("INTENT_STORE_PATH", ".intents.sqlite3")
+
+# Header of the block of user-entered parameters at the end of an intent
+PARAMS_MARKER = "# User-entered parameters:"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS intents (
+    name TEXT PRIMARY KEY,
+    type TEXT,
+    code TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    prompt TEXT,
+    parameters TEXT,
+    params TEXT,
+    status TEXT,
+    status_message TEXT,
+    version INTEGER NOT NULL,
+    created REAL,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS intents_type ON intents (type, name);
+CREATE INDEX IF NOT EXISTS intents_status ON intents (status, name);
+CREATE INDEX IF NOT EXISTS intents_updated ON intents (updated);
+
+CREATE TABLE IF NOT EXISTS intent_versions (
+    name TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    code TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    prompt TEXT,
+    source TEXT,
+    created REAL,
+    PRIMARY KEY (name, version)
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS intents_fts USING fts5 (
+    name, prompt, content='intents', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS intents_fts_insert AFTER INSERT ON intents BEGIN
+    INSERT INTO intents_fts (rowid, name, prompt) VALUES (new.rowid, new.name, new.prompt);
+END;
+CREATE TRIGGER IF NOT EXISTS intents_fts_delete AFTER DELETE ON intents BEGIN
+    INSERT INTO intents_fts (intents_fts, rowid, name, prompt) VALUES ('delete', old.rowid, old.name, old.prompt);
+END;
+CREATE TRIGGER IF NOT EXISTS intents_fts_update AFTER UPDATE OF name, prompt ON intents BEGIN
+    INSERT INTO intents_fts (intents_fts, rowid, name, prompt) VALUES ('delete', old.rowid, old.name, old.prompt);
+    INSERT INTO intents_fts (rowid, name, prompt) VALUES (new.rowid, new.name, new.prompt);
+END;
+"""
+
+# Columns returned by listings (code is only loaded by get())
+SUMMARY_COLUMNS = "name, type, sha256, prompt, parameters, params, status, status_message, version, created, updated"
+
+
+def code_sha256(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+# Replace the user-entered parameters block of an intent (never append a second one)
+def apply_params(code: str, params: dict) -> str:
+    for key in params:
+        if not str(key).isidentifier():
+            raise ValueError(f"⚠️ Invalid parameter name: '{key}'")
+
+    marker = code.find(PARAMS_MARKER)
+    if marker != -1:
+        code = code[:marker]
+    code = code.rstrip("\n")
+    if not params:
+        return code + "\n"
+
+    lines = [f"{key} = {value!r}" for key, value in params.items()]
+    return f"{code}\n\n{PARAMS_MARKER}\n" + "\n".join(lines) + "\n"
+
+
+# Quote every term so user input is never parsed as FTS syntax; terms match as prefixes
+def fts_query(query: str) -> str:
+    terms = ['"' + term.replace('"', '""') + '"*' for term in query.split()]
+    return " ".join(terms)
+
+
+class IntentStore:
+    """
+    Versioned store of intents in SQLite (WAL).
+
+    Each intent row holds its code, prompt, detected parameters,
+    user-entered parameters and last validation status; every change of
+    code is kept in `intent_versions`. Writes are single transactions, so
+    readers never see a half-written intent. Listings are paginated by a
+    keyset cursor on the name and prompts are searchable through FTS5.
+
+    The `.py` files in tools/ are an export of the store, written
+    atomically by `export()`; `sync()` brings changes made directly to
+    those files back into the store and re-exports the missing ones.
+    Removing a file therefore never deletes an intent: `delete()` (or
+    `sync(prune=True)`) does.
+    """
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _save(self, db, name: str, code: str, intent_type: str, source: str, params: dict = None) -> dict:
+        sha256 = code_sha256(code)
+        now = time.time()
+        row = db.execute("SELECT sha256, version FROM intents WHERE name = ?", (name,)).fetchone()
+        if row is not None and row["sha256"] == sha256 and params is None:
+            if intent_type is not None:
+                db.execute("UPDATE intents SET type = ? WHERE name = ?", (intent_type, name))
+            return {"name": name, "version": row["version"], "changed": False}
+
+        prompt = extract_prompt(code)
+        code_changed = row is None or row["sha256"] != sha256
+        if row is None:
+            # A re-created intent continues the history of the deleted one
+            version = db.execute(
+                "SELECT COALESCE(MAX(version), 0) + 1 FROM intent_versions WHERE name = ?", (name,)
+            ).fetchone()[0]
+        else:
+            version = row["version"] + code_changed
+        parameters = json.dumps(detect_parameters(code))
+        if row is None:
+            db.execute(
+                "INSERT INTO intents (name, type, code, sha256, prompt, parameters, params, version, created, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (name, intent_type, code, sha256, prompt, parameters, json.dumps(params or {}), version, now, now),
+            )
+        else:
+            # New code invalidates the previous validation result
+            db.execute(
+                "UPDATE intents SET type = COALESCE(?, type), code = ?, prompt = ?, parameters = ?,"
+                " params = COALESCE(?, params), version = ?, updated = ?,"
+                " status = CASE WHEN sha256 = ? THEN status END,"
+                " status_message = CASE WHEN sha256 = ? THEN status_message END, sha256 = ?"
+                " WHERE name = ?",
+                (intent_type, code, prompt, parameters, None if params is None else json.dumps(params),
+                 version, now, sha256, sha256, sha256, name),
+            )
+        if code_changed:
+            db.execute(
+                "INSERT INTO intent_versions (name, version, code, sha256, prompt, source, created)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, version, code, sha256, prompt, source, now),
+            )
+        return {"name": name, "version": version, "changed": code_changed}
+
+    def save(self, intent_name: str, code: str, intent_type: str = None, source: str = "api") -> dict:
+        """Store new code for an intent; a new version is recorded only if the code changed."""
+        with self._transaction() as db:
+            return self._save(db, intent_filename(intent_name), code, intent_type, source)
+
+    def save_many(self, entries, source: str = "api") -> list:
+        """Store (name, code, type) triples in a single transaction."""
+        with self._transaction() as db:
+            return [self._save(db, intent_filename(name), code, intent_type, source) for name, code, intent_type in entries]
+
+    def set_params(self, intent_name: str, params: dict) -> str:
+        """Replace the user-entered parameters of an intent; returns the new code."""
+        name = intent_filename(intent_name)
+        with self._transaction() as db:
+            row = db.execute("SELECT code FROM intents WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                raise KeyError(name)
+            code = apply_params(row["code"], params)
+            self._save(db, name, code, None, "params", params)
+            return code
+
+    def set_status(self, intent_name: str, status: str, message: str = None):
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE intents SET status = ?, status_message = ? WHERE name = ?",
+                (status, message, intent_filename(intent_name)),
+            )
+
+    def set_statuses(self, results):
+        """Record many (name, status, message) validation results in one transaction."""
+        with self._transaction() as db:
+            db.executemany(
+                "UPDATE intents SET status = ?, status_message = ? WHERE name = ?",
+                ((status, message, intent_filename(name)) for name, status, message in results),
+            )
+
+    def delete(self, intent_name: str) -> bool:
+        """Drop an intent; its versions are kept."""
+        with self._transaction() as db:
+            return db.execute("DELETE FROM intents WHERE name = ?", (intent_filename(intent_name),)).rowcount > 0
+
+    def get(self, intent_name: str):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM intents WHERE name = ?", (intent_filename(intent_name),)).fetchone()
+        return _row(row) if row is not None else None
+
+    def list(self, cursor: str = None, limit: int = 100, intent_type: str = None, status: str = None) -> dict:
+        """One page of intents ordered by name; pass `next_cursor` back to get the next page."""
+        where, args = [], []
+        if cursor:
+            where.append("name > ?")
+            args.append(cursor)
+        if intent_type:
+            where.append("type = ?")
+            args.append(intent_type)
+        if status:
+            where.append("status = ?")
+            args.append(status)
+        sql = f"SELECT {SUMMARY_COLUMNS} FROM intents"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY name LIMIT ?"
+
+        with self._lock:
+            rows = self._db.execute(sql, (*args, limit)).fetchall()
+        items = [_row(row) for row in rows]
+        next_cursor = items[-1]["name"] if len(items) == limit else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    def search(self, query: str, limit: int = 50) -> list:
+        """Full-text search over intent names and prompts, best matches first."""
+        if not query.split():
+            return []
+        columns = ", ".join(f"intents.{column.strip()}" for column in SUMMARY_COLUMNS.split(","))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {columns} FROM intents_fts JOIN intents ON intents.rowid = intents_fts.rowid"
+                " WHERE intents_fts MATCH ? ORDER BY rank LIMIT ?",
+                (fts_query(query), limit),
+            ).fetchall()
+        return [_row(row) for row in rows]
+
+    def history(self, intent_name: str) -> list:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT name, version, sha256, prompt, source, created FROM intent_versions"
+                " WHERE name = ? ORDER BY version DESC",
+                (intent_filename(intent_name),),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def version(self, intent_name: str, version: int):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM intent_versions WHERE name = ? AND version = ?",
+                (intent_filename(intent_name), version),
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM intents").fetchone()[0]
+
+    def export(self, intent_name: str, tools_dir: str) -> str:
+        """Write one intent to tools_dir atomically; returns the file path."""
+        intent = self.get(intent_name)
+        if intent is None:
+            raise KeyError(intent_filename(intent_name))
+        os.makedirs(tools_dir, exist_ok=True)
+        filename = os.path.join(tools_dir, intent["name"])
+        atomic_write(filename, intent["code"], overwrite=True)
+        return filename
+
+    def export_all(self, tools_dir: str) -> int:
+        os.makedirs(tools_dir, exist_ok=True)
+        with self._lock:
+            rows = self._db.execute("SELECT name, code FROM intents").fetchall()
+        for row in rows:
+            atomic_write(os.path.join(tools_dir, row["name"]), row["code"], overwrite=True)
+        return len(rows)
+
+    def sync(self, intents, tools_dir: str = None, prune: bool = False) -> dict:
+        """
+        Reconcile the store with the files found in tools/ (IntentInfo
+        objects from the registry): new or edited files become new
+        versions. The store stays the source of truth for intents whose
+        file is gone: they are exported again to `tools_dir`, and dropped
+        only with `prune=True`. Returns the counts and the restored names.
+        """
+        intents = {info.name: info for info in intents}
+        with self._lock:
+            stored = dict(self._db.execute("SELECT name, sha256 FROM intents").fetchall())
+
+        changed = [info for name, info in intents.items() if stored.get(name) != info.sha256]
+        missing = [name for name in stored if name not in intents]
+        with self._transaction() as db:
+            for info in changed:
+                self._save(db, info.name, info.code, None, "disk")
+            if prune:
+                for name in missing:
+                    db.execute("DELETE FROM intents WHERE name = ?", (name,))
+
+        restored = []
+        if not prune and tools_dir is not None:
+            for name in missing:
+                self.export(name, tools_dir)
+                restored.append(name)
+        return {"changed": len(changed), "restored": restored, "removed": len(missing) if prune else 0}
+
+    def close(self):
+        self._db.close()
+
+
+def _row(row) -> dict:
+    intent = dict(row)
+    intent["parameters"] = json.loads(intent["parameters"] or "[]")
+    intent["params"] = json.loads(intent["params"] or "{}")
+    return intent
+
+
+if __name__ == "__main__":
+    from intent_registry import IntentRegistry
+
+    parser = argparse.ArgumentParser(description="Import or export the intent store")
+    parser.add_argument("command", choices=["import", "export"], help="import: tools dir -> store, export: store -> tools dir")
+    parser.add_argument("tools_dir", nargs="?", default="tools")
+    parser.add_argument("--store", default=STORE_PATH)
+    parser.add_argument("--prune", action="store_true", help="import: drop stored intents whose file is missing")
+    args = parser.parse_args()
+
+    store = IntentStore(args.store)
+    if args.command == "import":
+        registry = IntentRegistry(args.tools_dir)
+        registry.load()
+        result = store.sync(registry.intents.values(), args.tools_dir, prune=args.prune)
+        print(
+            f"✅ {result['changed']} intents imported, {len(result['restored'])} restored, {result['removed']} removed"
+        )
+    else:
+        print(f"✅ {store.export_all(args.tools_dir)} intents exported to {args.tools_dir}")
+    store.close()
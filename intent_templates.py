@@ -0,0 +1,165 @@
+import ast
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from jinja2 import Environment, StrictUndefined
+
+# Intent types, their default parameters and code templates
+TOOL_TYPES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tool_types.json")
+
+
+# Mode of a file created with open() under the process umask (mkstemp uses 0600).
+# The umask is read from /proc: os.umask() would change it process-wide, even briefly
+def _file_mode() -> int:
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return 0o666 & ~int(line.split()[1], 8)
+    except OSError:
+        pass
+    return 0o644
+
+
+FILE_MODE = _file_mode()
+
+
+class TemplateEngine:
+    """
+    Renders intent code from the templates in tool_types.json.
+
+    Each template is compiled by Jinja2 the first time its type is used
+    and the compiled template is kept for every later render. Templates
+    receive `parameters` (the parameter names joined with ", "),
+    `parameter_list`, `intent_name` and `description`.
+    """
+
+    def __init__(self, path: str = TOOL_TYPES_PATH):
+        with open(path, encoding="utf-8") as f:
+            self.tool_types = json.load(f)
+        self.env = Environment(undefined=StrictUndefined, keep_trailing_newline=True, autoescape=False)
+        self._compiled = {}
+
+    def template(self, intent_type: str):
+        compiled = self._compiled.get(intent_type)
+        if compiled is None:
+            compiled = self.env.from_string(self.tool_types[intent_type]["template"])
+            self._compiled[intent_type] = compiled
+        return compiled
+
+    def render(self, intent_type: str, intent_name: str = "", parameters: list = None, description: str = None) -> str:
+        if intent_type not in self.tool_types:
+            raise KeyError(intent_type)
+
+        parameters = parameters or self.tool_types[intent_type]["parameters"]
+        code = self.template(intent_type).render(
+            parameters=", ".join(parameters),
+            parameter_list=parameters,
+            intent_name=intent_name,
+            description=description,
+        )
+        if description:
+            code = f"# Prompt used: {description}\n\n{code}"
+        return code
+
+
+# Error message when rendered code does not parse (a template that breaks with these parameters), else None
+def syntax_error(code: str):
+    try:
+        ast.parse(code)
+    except SyntaxError as e:
+        return f"⚠️ The rendered code does not parse (line {e.lineno}: {e.msg})."
+    return None
+
+
+def _fsync_dir(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# Write a file atomically: readers see either nothing or the whole file, also after a crash
+def atomic_write(filename: str, content: str, overwrite: bool = False) -> bool:
+    directory = os.path.dirname(filename) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        os.fchmod(fd, FILE_MODE)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+
+        if overwrite:
+            os.replace(tmp_path, filename)
+        else:
+            try:
+                os.link(tmp_path, filename)  # Fails if the file already exists
+            except FileExistsError:
+                return False
+            except OSError:
+                # No hard links on this filesystem: claim the name, then move the file over it
+                try:
+                    os.close(os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, FILE_MODE))
+                except FileExistsError:
+                    return False
+                os.replace(tmp_path, filename)
+        _fsync_dir(directory)
+        return True
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def scaffold(engine: TemplateEngine, entries, tools_dir: str, overwrite: bool = False, workers: int = 16) -> list:
+    """
+    Render and write many intents in one pass.
+
+    `entries` are dicts with `intent_type`, `intent_name` and optionally
+    `parameters` and `description`. Rendering uses the compiled templates;
+    code that does not parse is reported as an error and not written. The
+    files are written in parallel. Returns one status dict per entry.
+    """
+    os.makedirs(tools_dir, exist_ok=True)
+    results = []
+    writes = []
+
+    for entry in entries:
+        intent_type, intent_name = entry.get("intent_type"), entry.get("intent_name")
+        if intent_type not in engine.tool_types:
+            results.append({"intent_name": intent_name, "status": "error", "message": f"⚠️ Intent type '{intent_type}' not recognized."})
+            continue
+        if not intent_name:
+            results.append({"intent_name": intent_name, "status": "error", "message": "⚠️ Missing intent_name."})
+            continue
+
+        code = engine.render(intent_type, intent_name, entry.get("parameters"), entry.get("description"))
+        error = syntax_error(code)
+        if error:
+            results.append({"intent_name": intent_name, "intent_type": intent_type, "status": "error", "message": error})
+            continue
+        result = {
+            "intent_name": intent_name,
+            "intent_type": intent_type,
+            "filename": os.path.join(tools_dir, f"{intent_name}.py"),
+            "code": code,
+        }
+        results.append(result)
+        writes.append((result, code))
+
+    def write(job):
+        result, code = job
+        try:
+            created = atomic_write(result["filename"], code, overwrite)
+            result["status"] = "created" if created else "exists"
+        except OSError as e:
+            result["status"] = "error"
+            result["message"] = f"⚠️ {e}"
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(write, writes))
+
+    return results
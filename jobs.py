@@ -0,0 +1,204 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+
+# Job queue settings, configurable per deployment
+JOBS_JOURNAL = os.getenv("JOBS_JOURNAL", ".jobs.jsonl")
+JOBS_CONCURRENCY = int(os.getenv("JOBS_CONCURRENCY", "2"))
+JOBS_HISTORY = int(os.getenv("JOBS_HISTORY", "1000"))
+# Seconds a job keeps retrying while the LLM queues are full before it fails
+JOBS_BUSY_TIMEOUT = float(os.getenv("JOBS_BUSY_TIMEOUT", "600"))
+
+FINISHED = ("done", "failed")
+
+logger = logging.getLogger("multiintent.jobs")
+
+
+@dataclass
+class Job:
+    id: str
+    intent_name: str
+    description: str
+    status: str = "queued"
+    result: dict = None
+    error: str = None
+    created: float = field(default_factory=time.time)
+    updated: float = field(default_factory=time.time)
+    chunks: list = field(default_factory=list, repr=False)
+    subscribers: set = field(default_factory=set, repr=False)
+
+    @property
+    def output(self) -> str:
+        return "".join(self.chunks)
+
+    def snapshot(self) -> dict:
+        return {
+            "id": self.id,
+            "intent_name": self.intent_name,
+            "description": self.description,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "updated": self.updated,
+        }
+
+    def append_output(self, token: str):
+        self.chunks.append(token)
+        self.publish("token", token)
+
+    def publish(self, event: str, data):
+        for queue in self.subscribers:
+            queue.put_nowait((event, data))
+
+
+class JobQueue:
+    """
+    Background queue of intent generations.
+
+    Submitted jobs return immediately with an ID and are run by a fixed
+    number of worker tasks through `runner(job)`, an async callable that
+    may stream partial output with `job.append_output()` and returns the
+    job's result. Every state change is appended to a JSONL journal; on
+    start the journal is replayed and unfinished jobs are queued again.
+
+    Only the last `history` finished jobs are kept, in memory and in the
+    journal, which is compacted to one line per job whenever it grows
+    past twice the jobs kept (plus `history` lines).
+    """
+
+    def __init__(
+        self, runner, journal_path: str = JOBS_JOURNAL, concurrency: int = JOBS_CONCURRENCY, history: int = JOBS_HISTORY
+    ):
+        self.runner = runner
+        self.journal_path = journal_path
+        self.concurrency = concurrency
+        self.history = history
+        self.jobs = {}
+        self._finished = deque()
+        self._queue = None
+        self._workers = []
+        self._journal = None
+        self._journal_lines = 0
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._replay()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _replay(self):
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line after a crash
+                    self.jobs[record["id"]] = Job(**record)
+
+        # Keep the most recent finished jobs and resume the rest
+        self._finished = deque(
+            job.id for job in sorted(self.jobs.values(), key=lambda job: job.updated) if job.status in FINISHED
+        )
+        self._evict()
+
+        for job in sorted(self.jobs.values(), key=lambda job: job.created):
+            if job.status not in FINISHED:
+                job.status = "queued"
+                self._queue.put_nowait(job)
+
+        self._compact()
+
+    # Forget the oldest finished jobs beyond `history`
+    def _evict(self):
+        while len(self._finished) > self.history:
+            self.jobs.pop(self._finished.popleft(), None)
+
+    # Rewrite the journal down to one line per job
+    def _compact(self):
+        if self._journal is not None:
+            self._journal.close()
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for job in self.jobs.values():
+                f.write(json.dumps(job.snapshot()) + "\n")
+        os.replace(tmp_path, self.journal_path)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal_lines = len(self.jobs)
+
+    def _record(self, job: Job):
+        job.updated = time.time()
+        self._journal.write(json.dumps(job.snapshot()) + "\n")
+        self._journal.flush()
+        self._journal_lines += 1
+        job.publish("status", job.snapshot())
+        if job.status in FINISHED:
+            self._finished.append(job.id)
+            self._evict()
+        if self._journal_lines > 2 * len(self.jobs) + self.history:
+            self._compact()
+
+    def submit(self, items) -> list:
+        """Queue (intent_name, description) pairs; returns the new jobs."""
+        jobs = []
+        for intent_name, description in items:
+            job = Job(id=uuid.uuid4().hex, intent_name=intent_name, description=description)
+            self.jobs[job.id] = job
+            self._record(job)
+            self._queue.put_nowait(job)
+            jobs.append(job)
+        return jobs
+
+    def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.chunks = []
+            self._record(job)
+            try:
+                job.result = await self.runner(job)
+                job.status = "done"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.error = f"⚠️ {type(e).__name__}: {e}"
+                job.status = "failed"
+                logger.exception("Job %s (%s) failed", job.id, job.intent_name)
+            self._record(job)
+
+    async def events(self, job: Job):
+        """Yield (event, data) pairs for a job until it finishes."""
+        queue = asyncio.Queue()
+        job.subscribers.add(queue)
+        snapshot, backlog = job.snapshot(), job.output
+        try:
+            yield "status", snapshot
+            if backlog:
+                yield "token", backlog
+            if snapshot["status"] in FINISHED:
+                return
+
+            while True:
+                event, data = await queue.get()
+                yield event, data
+                if event == "status" and data["status"] in FINISHED:
+                    return
+        finally:
+            job.subscribers.discard(queue)
@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Cache settings, configurable per deployment
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3")
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+CACHE_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", "10000"))
+# Inserts between two trims of the disk tier
+CACHE_TRIM_EVERY = int(os.getenv("LLM_CACHE_TRIM_EVERY", "100"))
+CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+
+
+# Normalize a prompt so that irrelevant whitespace does not change the key
+def normalize_prompt(prompt: str) -> str:
+    lines = prompt.replace("\r\n", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+class LLMCache:
+    """
+    Content-addressed cache of LLM generations.
+
+    Entries are keyed by a hash of (model, normalized prompt, options,
+    context) and kept in two tiers: a bounded in-memory LRU in front of a
+    SQLite table that survives restarts. Entries older than `ttl` seconds
+    are dropped on read; every `trim_every` inserts the disk tier is
+    trimmed to `max_disk_entries` by least recent access. get and set are
+    coroutines: the memory tier is served on the event loop, SQLite is
+    read and written in a worker thread.
+    """
+
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        ttl: float = CACHE_TTL,
+        max_memory_entries: int = CACHE_MEMORY_ENTRIES,
+        max_disk_entries: int = CACHE_DISK_ENTRIES,
+        trim_every: int = CACHE_TRIM_EVERY,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.trim_every = max(1, trim_every)
+        self.memory = OrderedDict()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self._inserts = 0
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, model TEXT, value TEXT, created REAL, accessed REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed)")
+
+    @staticmethod
+    def key(payload: dict, variant: str = "") -> str:
+        identity = json.dumps(
+            [
+                payload["model"],
+                normalize_prompt(payload["prompt"]),
+                payload.get("options") or {},
+                payload.get("context"),
+                variant,
+            ],
+            sort_keys=True,
+        )
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    async def get(self, key: str):
+        now = time.time()
+        entry = self.memory.get(key)
+        if entry is not None:
+            created, value = entry
+            if now - created <= self.ttl:
+                self.memory.move_to_end(key)
+                self.hits_memory += 1
+                return value
+            del self.memory[key]
+
+        # Disk lookups run in a worker thread, off the event loop
+        row = await asyncio.to_thread(self._load, key, now)
+        if row is None:
+            self.misses += 1
+            return None
+        created, value = row
+        self._remember(key, created, value)
+        self.hits_disk += 1
+        return value
+
+    def _load(self, key: str, now: float):
+        with self._lock:
+            row = self._db.execute("SELECT value, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            self._db.execute("UPDATE llm_cache SET accessed = ? WHERE key = ?", (now, key))
+        return row[1], json.loads(row[0])
+
+    async def set(self, key: str, model: str, value: dict):
+        now = time.time()
+        self._remember(key, now, value)
+        self._inserts += 1
+        trim = self._inserts % self.trim_every == 0
+        await asyncio.to_thread(self._store, key, model, value, now, trim)
+
+    def _store(self, key: str, model: str, value: dict, now: float, trim: bool):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, value, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, model, json.dumps(value), now, now),
+            )
+            if trim:
+                self._db.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    " SELECT key FROM llm_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+
+    def _remember(self, key: str, created: float, value: dict):
+        self.memory[key] = (created, value)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.memory.clear()
+            self._db.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict:
+        with self._lock:
+            disk_entries = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "disk_entries": disk_entries,
+        }
+
+    def close(self):
+        self._db.close()
+
+
+# Cache shared by the apps, or None when disabled with LLM_CACHE=0
+def default_cache():
+    return LLMCache() if CACHE_ENABLED else None
@@ -0,0 +1,237 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+# Scheduling classes, most urgent first
+INTERACTIVE, RUNTIME, BATCH = 0, 1, 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", RUNTIME: "runtime", BATCH: "batch"}
+
+# Pool and scheduler settings, configurable per deployment
+BACKEND_CONCURRENCY = int(os.getenv("LLM_BACKEND_CONCURRENCY", "4"))
+HEALTH_INTERVAL = float(os.getenv("LLM_HEALTH_INTERVAL", "10"))
+RESERVED_INTERACTIVE = int(os.getenv("LLM_RESERVED_INTERACTIVE", "1"))
+QUEUE_LIMITS = {
+    INTERACTIVE: int(os.getenv("LLM_QUEUE_INTERACTIVE", "32")),
+    RUNTIME: int(os.getenv("LLM_QUEUE_RUNTIME", "64")),
+    BATCH: int(os.getenv("LLM_QUEUE_BATCH", "256")),
+}
+
+# Failures before the request was sent: another backend can take the call
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+# Priority of the LLM calls made in the current request or task
+priority = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+logger = logging.getLogger("multiintent.llm_pool")
+
+
+class OllamaBusy(Exception):
+    """Raised when the queue of a priority class is full; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: int, message: str = "⚠️ The model servers are busy, try again later."):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Backend:
+    """One Ollama-compatible server with its own keep-alive connection pool."""
+
+    def __init__(self, url: str, limits: httpx.Limits, timeout: httpx.Timeout):
+        self.url = url
+        self.limits = limits
+        self.timeout = timeout
+        self.outstanding = 0
+        self.healthy = True
+        self.requests = 0
+        self.errors = 0
+        self.last_error = None
+        self._http = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        # Created lazily so the backend can be (re)opened after aclose()
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(base_url=self.url, limits=self.limits, timeout=self.timeout)
+        return self._http
+
+    def snapshot(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+class BackendPool:
+    """
+    Ollama backends balanced by least outstanding requests.
+
+    A backend that refuses connections is marked unhealthy and skipped
+    until the periodic health check (GET /api/tags) sees it answer again.
+    """
+
+    def __init__(self, urls: list, limits: httpx.Limits, timeout: httpx.Timeout, health_interval: float = HEALTH_INTERVAL):
+        self.backends = [Backend(url, limits, timeout) for url in urls]
+        self.health_interval = health_interval
+        self._turn = itertools.count()
+        self._task = None
+
+    def healthy(self) -> list:
+        return [backend for backend in self.backends if backend.healthy]
+
+    def pick(self, exclude=()) -> Backend:
+        candidates = [backend for backend in self.healthy() if backend not in exclude]
+        candidates = candidates or [backend for backend in self.backends if backend not in exclude] or self.backends
+        # Ties are broken in turn so idle backends share the load
+        turn = next(self._turn)
+        return min(candidates, key=lambda b: (b.outstanding, (self.backends.index(b) - turn) % len(self.backends)))
+
+    @asynccontextmanager
+    async def use(self, exclude=()):
+        backend = self.pick(exclude)
+        backend.outstanding += 1
+        backend.requests += 1
+        try:
+            yield backend
+        except httpx.TransportError as e:
+            backend.errors += 1
+            backend.last_error = str(e) or type(e).__name__
+            if isinstance(e, CONNECT_ERRORS):
+                backend.healthy = False
+            raise
+        finally:
+            backend.outstanding -= 1
+
+    async def check(self, backend: Backend):
+        try:
+            response = await backend.http.get("/api/tags", timeout=5)
+            healthy = response.status_code < 500
+        except httpx.HTTPError as e:
+            backend.last_error = str(e) or type(e).__name__
+            healthy = False
+        if healthy != backend.healthy:
+            logger.warning("Backend %s is now %s", backend.url, "healthy" if healthy else "unhealthy")
+        backend.healthy = healthy
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.gather(*(self.check(backend) for backend in self.backends))
+            await asyncio.sleep(self.health_interval)
+
+    def start(self):
+        if self._task is None and self.health_interval:
+            self._task = asyncio.create_task(self._health_loop())
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for backend in self.backends:
+            await backend.aclose()
+
+
+class PriorityScheduler:
+    """
+    Admission control for LLM calls.
+
+    At most `capacity()` calls run at once; the others wait in one queue
+    ordered by priority (interactive, then runtime, then batch) and
+    arrival. The last `reserved` slots are only given to interactive
+    calls, so a burst of batch work cannot starve them. When the queue of
+    a class is full, `acquire` raises OllamaBusy with a Retry-After
+    estimate based on recent call durations.
+    """
+
+    def __init__(self, capacity, queue_limits: dict = None, reserved: int = RESERVED_INTERACTIVE):
+        self.capacity = capacity
+        self.queue_limits = queue_limits or QUEUE_LIMITS
+        self.reserved = reserved
+        self.running = 0
+        self.queued = {level: 0 for level in PRIORITY_NAMES}
+        self.rejected = {level: 0 for level in PRIORITY_NAMES}
+        self.average_duration = 10.0
+        self._waiting = []
+        self._order = itertools.count()
+
+    def _limit(self, level: int) -> int:
+        capacity = self.capacity()
+        return capacity if level == INTERACTIVE else max(1, capacity - self.reserved)
+
+    def retry_after(self, level: int) -> int:
+        ahead = sum(count for other, count in self.queued.items() if other <= level)
+        return max(1, math.ceil(self.average_duration * (ahead + 1) / max(1, self.capacity())))
+
+    async def acquire(self, level: int):
+        if not self._waiting and self.running < self._limit(level):
+            self.running += 1
+            return
+        if self.queued[level] >= self.queue_limits[level]:
+            self.rejected[level] += 1
+            raise OllamaBusy(self.retry_after(level))
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (level, next(self._order), waiter))
+        self.queued[level] += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just as the caller went away
+                self.release()
+            raise
+        finally:
+            self.queued[level] -= 1
+
+    def release(self, duration: float = None):
+        self.running -= 1
+        if duration is not None:
+            self.average_duration = 0.9 * self.average_duration + 0.1 * duration
+        self._wake()
+
+    def _wake(self):
+        while self._waiting:
+            level, _, waiter = self._waiting[0]
+            if waiter.cancelled():
+                heapq.heappop(self._waiting)
+                continue
+            if self.running >= self._limit(level):
+                return
+            heapq.heappop(self._waiting)
+            self.running += 1
+            waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, level: int = None):
+        level = priority.get() if level is None else level
+        await self.acquire(level)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def snapshot(self) -> dict:
+        return {
+            "capacity": self.capacity(),
+            "running": self.running,
+            "queued": {PRIORITY_NAMES[level]: count for level, count in self.queued.items()},
+            "rejected": {PRIORITY_NAMES[level]: count for level, count in self.rejected.items()},
+            "average_duration": self.average_duration,
+        }
@@ -1,16 +1,71 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 import httpx
 import asyncio
+import json
+import time
 
-app = FastAPI(title="Generador de Tools Multi-Intent con Ollama Local")
+from llm_cache import default_cache
+from llm_pool import RUNTIME, OllamaBusy, priority
+from metrics import REGISTRY, MetricsMiddleware, cache_collector, llm_pool_collector, span
+from model_cascade import ModelCascade
+from ollama_client import OllamaClient, OllamaError
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Un único cliente para toda la vida de la app: pool de conexiones
+    # keep-alive compartido, coalescencia de prompts idénticos en vuelo y
+    # caché de respuestas (LLM_CACHE_*, ver llm_cache.py).
+    # Límites y timeouts se configuran con las variables OLLAMA_* (ver ollama_client.py)
+    # Con OLLAMA_HOSTS=url1,url2,... las llamadas se reparten entre varios
+    # servidores (el menos cargado primero) con prioridad interactiva > runtime > batch
+    app.state.ollama = OllamaClient(cache=default_cache())
+    app.state.ollama.start()
+    REGISTRY.add_collector(cache_collector(app.state.ollama.cache))
+    REGISTRY.add_collector(llm_pool_collector(app.state.ollama))
+    # Modelos por tipo de herramienta (model_tiers.json): primero uno pequeño,
+    # se escala al siguiente si falla. Se precargan al arrancar (OLLAMA_KEEP_ALIVE)
+    app.state.cascade = ModelCascade(app.state.ollama)
+    app.state.cascade.start()
+    yield
+    await app.state.cascade.stop()
+    await app.state.ollama.aclose()
+
+
+app = FastAPI(title="Generador de Tools Multi-Intent con Ollama Local", lifespan=lifespan)
+# Latencia por ruta, peticiones en curso y códigos de estado para /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Colas del LLM llenas: 429 con el tiempo estimado hasta que haya hueco
+@app.exception_handler(OllamaBusy)
+async def ollama_busy_handler(request, exc: OllamaBusy):
+    return JSONResponse(
+        status_code=429, content={"error": str(exc), "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 # Configuración de las herramientas
 class ToolConfig(BaseModel):
     type: str
     count: int
 
+# Herramienta destino de una petición /multi (sin id: la primera instancia del tipo)
+class ToolRef(BaseModel):
+    type: str
+    id: Optional[int] = None
+
+# Petición /multi: un enunciado procesado por varias herramientas a la vez
+class MultiRequest(BaseModel):
+    utterance: str
+    tools: List[ToolRef]
+    timeout: float = 30.0
+    stream: bool = True
+
 # Ejemplo de configuración:
 # - 3 instancias de RAG con OpenSearch
 # - 2 instancias de herramienta vacía (generic_empty)
@@ -24,68 +79,196 @@ tools_config = [
 ]
 
 # Función para consumir LLMs desde un Ollama local
-async def call_ollama(prompt: str):
-    url = "http://localhost:11434/api/generate"  # Ajusta la URL y puerto según tu configuración local
-    payload = {
-        "model": "deepseek-r1:latest",  # Especifica el modelo que deseas utilizar, ej: "llama2"
-        "prompt": prompt,
-        "options": {}  # Puedes agregar opciones adicionales si es necesario
-    }
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(url, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            return data
-        except httpx.HTTPError as e:
-            # Manejo de errores: log o retornar un mensaje adecuado
-            return {"error": str(e)}
-
-# Función para crear un router para cada herramienta
-def create_tool_router(tool_type: str, tool_id: int) -> APIRouter:
-    router = APIRouter(prefix=f"/{tool_type}/{tool_id}", tags=[f"{tool_type}_{tool_id}"])
-    
-    @router.get("/")
-    async def get_info():
-        """
-        Endpoint de información básica de la herramienta.
-        """
-        return {
-            "tool_type": tool_type,
-            "tool_id": tool_id,
-            "description": "Endpoint de información de la herramienta."
-        }
-    
-    @router.post("/process")
-    async def process_tool(data: dict):
-        """
-        Endpoint para procesar datos con la herramienta correspondiente.
-        La lógica varía según el tipo de herramienta.
-        """
-        if tool_type == "rag_opensearch":
-            # Lógica de procesamiento para RAG con OpenSearch
-            result = {"result": "Procesamiento RAG con OpenSearch", "input": data}
-        elif tool_type == "nlp_to_sql":
-            # Lógica para convertir lenguaje natural a SQL
-            result = {"result": "Consulta SQL generada", "input": data}
-        elif tool_type == "generic_empty":
-            # Lógica genérica (placeholder)
-            result = {"result": "Procesamiento genérico", "input": data}
-        else:
-            raise HTTPException(status_code=400, detail="Tipo de herramienta no soportado")
-        
-        # Integración con Ollama local para obtener respuesta del LLM
-        ollama_response = await call_ollama(f"Procesar {data} con {tool_type}")
-        result["ollama"] = ollama_response
-        return result
-        
-    return router
-
-# Registrar dinámicamente los routers basados en la configuración
+# Las URLs (OLLAMA_HOST u OLLAMA_HOSTS) se configuran por variable de entorno y los modelos por tipo en model_tiers.json
+async def call_ollama(prompt: str, tool_type: str = None, options: dict = None, use_cache: bool = True):
+    try:
+        run = await app.state.cascade.run(prompt, tool_type, use_cache=use_cache, stream=False, options=options).result()
+        generation = run.generation
+        return {"model": generation.model, "response": generation.text, "done": generation.done, "cached": generation.cached}
+    except (httpx.HTTPError, OllamaError) as e:
+        # Manejo de errores: log o retornar un mensaje adecuado
+        return {"error": str(e)}
+
+# Lógica de procesamiento de cada tipo de herramienta
+async def process_rag_opensearch(data: dict) -> dict:
+    # Lógica de procesamiento para RAG con OpenSearch
+    return {"result": "Procesamiento RAG con OpenSearch", "input": data}
+
+async def process_nlp_to_sql(data: dict) -> dict:
+    # Lógica para convertir lenguaje natural a SQL
+    return {"result": "Consulta SQL generada", "input": data}
+
+async def process_generic_empty(data: dict) -> dict:
+    # Lógica genérica (placeholder)
+    return {"result": "Procesamiento genérico", "input": data}
+
+# Registro de handlers: tipo de herramienta -> función de procesamiento
+TOOL_HANDLERS = {
+    "rag_opensearch": process_rag_opensearch,
+    "nlp_to_sql": process_nlp_to_sql,
+    "generic_empty": process_generic_empty,
+}
+
+# Instancias activas: tipo de herramienta -> ids registrados
+tool_instances = {}
+
+def register_tool(tool_type: str, tool_id: int):
+    if tool_type not in TOOL_HANDLERS:
+        raise HTTPException(status_code=400, detail="Tipo de herramienta no soportado")
+    tool_instances.setdefault(tool_type, set()).add(tool_id)
+
+def unregister_tool(tool_type: str, tool_id: int):
+    ids = tool_instances.get(tool_type, set())
+    if tool_id not in ids:
+        raise HTTPException(status_code=404, detail="Herramienta no encontrada")
+    ids.discard(tool_id)
+
+def get_tool_handler(tool_type: str, tool_id: int):
+    if tool_id not in tool_instances.get(tool_type, ()):
+        raise HTTPException(status_code=404, detail="Herramienta no encontrada")
+    return TOOL_HANDLERS[tool_type]
+
+# Registrar las instancias iniciales basadas en la configuración
 for config in tools_config:
     for i in range(1, config.count + 1):
-        router = create_tool_router(config.type, i)
-        app.include_router(router)
+        register_tool(config.type, i)
+
+# Estadísticas de aciertos/fallos de la caché del LLM
+@app.get("/cache_stats")
+async def cache_stats():
+    cache = app.state.ollama.cache
+    return {"enabled": False} if cache is None else {"enabled": True, **cache.stats()}
+
+# Estado de los servidores del LLM y de las colas por prioridad
+@app.get("/llm_pool")
+async def llm_pool():
+    return app.state.ollama.snapshot()
+
+# Modelos por tipo de herramienta y estadísticas por modelo (intentos, éxito, latencia)
+@app.get("/model_stats")
+async def model_stats():
+    return app.state.cascade.snapshot()
+
+# Métricas en formato Prometheus (latencias, llamadas al LLM, caché)
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+# Alta y baja de instancias en caliente, sin reconstruir la app
+@app.get("/tools")
+async def list_tools():
+    return {tool_type: sorted(ids) for tool_type, ids in tool_instances.items()}
+
+@app.post("/tools")
+async def add_tools(config: ToolConfig):
+    """
+    Registra `count` instancias nuevas del tipo indicado a continuación de las existentes.
+    """
+    start = max(tool_instances.get(config.type, ()), default=0) + 1
+    for i in range(start, start + config.count):
+        register_tool(config.type, i)
+    return {"tool_type": config.type, "tool_ids": list(range(start, start + config.count))}
+
+@app.delete("/tools/{tool_type}/{tool_id}")
+async def remove_tool(tool_type: str, tool_id: int):
+    unregister_tool(tool_type, tool_id)
+    return {"tool_type": tool_type, "tool_id": tool_id, "removed": True}
+
+# Una única ruta paramétrica para todas las herramientas: el tipo se
+# resuelve en el diccionario de handlers en lugar de un router por instancia
+@app.get("/{tool_type}/{tool_id}/", tags=["tools"])
+async def get_info(tool_type: str, tool_id: int):
+    """
+    Endpoint de información básica de la herramienta.
+    """
+    get_tool_handler(tool_type, tool_id)
+    return {
+        "tool_type": tool_type,
+        "tool_id": tool_id,
+        "description": "Endpoint de información de la herramienta."
+    }
+
+@app.post("/{tool_type}/{tool_id}/process", tags=["tools"])
+async def process_tool(tool_type: str, tool_id: int, data: dict, no_cache: bool = False):
+    """
+    Endpoint para procesar datos con la herramienta correspondiente.
+    La lógica varía según el tipo de herramienta.
+    Con `no_cache=true` se ignora la caché de respuestas del LLM.
+    """
+    handler = get_tool_handler(tool_type, tool_id)
+    return await run_tool(handler, tool_type, data, use_cache=not no_cache)
+
+# Ejecución de una herramienta: su lógica más la respuesta del LLM
+async def run_tool(handler, tool_type: str, data: dict, use_cache: bool = True) -> dict:
+    # Las llamadas de las herramientas ceden el paso a las interactivas
+    priority.set(RUNTIME)
+    with span("tool_handler", tool_type=tool_type):
+        result = await handler(data)
+
+    # Integración con Ollama local para obtener respuesta del LLM
+    with span("tool_llm", tool_type=tool_type):
+        ollama_response = await call_ollama(f"Procesar {data} con {tool_type}", tool_type, use_cache=use_cache)
+    result["ollama"] = ollama_response
+    return result
+
+# Ejecuta una herramienta de /multi con su timeout y describe el resultado
+async def run_tool_with_timeout(handler, tool_type: str, tool_id: int, data: dict, timeout: float) -> dict:
+    started = time.perf_counter()
+    outcome = {"tool_type": tool_type, "tool_id": tool_id}
+    try:
+        outcome["result"] = await asyncio.wait_for(run_tool(handler, tool_type, data), timeout)
+        outcome["status"] = "ok"
+    except asyncio.TimeoutError:
+        outcome["status"] = "timeout"
+    except OllamaBusy as e:
+        outcome["status"] = "busy"
+        outcome["retry_after"] = e.retry_after
+    except Exception as e:
+        outcome["status"] = "error"
+        outcome["error"] = str(e)
+    outcome["duration"] = time.perf_counter() - started
+    return outcome
+
+@app.post("/multi")
+async def process_multi(request: MultiRequest):
+    """
+    Procesa un enunciado con varias herramientas de forma concurrente.
+    Con `stream=true` (por defecto) devuelve NDJSON: una línea por herramienta
+    a medida que termina y una línea final con `done`, de modo que la latencia
+    total es la de la herramienta más lenta y no la suma de todas.
+    """
+    targets = []
+    for tool in request.tools:
+        tool_id = tool.id if tool.id is not None else min(tool_instances.get(tool.type, ()), default=None)
+        if tool_id is None:
+            raise HTTPException(status_code=404, detail=f"Herramienta no encontrada: {tool.type}")
+        targets.append((get_tool_handler(tool.type, tool_id), tool.type, tool_id))
+
+    data = {"utterance": request.utterance}
+    started = time.perf_counter()
+
+    if not request.stream:
+        results = await asyncio.gather(*(
+            run_tool_with_timeout(handler, tool_type, tool_id, data, request.timeout)
+            for handler, tool_type, tool_id in targets
+        ))
+        return {"results": results, "duration": time.perf_counter() - started}
+
+    async def results():
+        tasks = [
+            asyncio.create_task(run_tool_with_timeout(handler, tool_type, tool_id, data, request.timeout))
+            for handler, tool_type, tool_id in targets
+        ]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished) + "\n"
+            yield json.dumps({"done": True, "duration": time.perf_counter() - started}) + "\n"
+        finally:
+            # Si el cliente se desconecta se cancelan las herramientas pendientes
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,253 @@
+import contextvars
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+# Per-request span timings are logged only when TRACE_SPANS=1
+TRACE_SPANS = os.getenv("TRACE_SPANS", "0") == "1"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# File the spans are written to (default: stderr)
+TRACE_FILE = os.getenv("TRACE_FILE")
+
+trace_logger = logging.getLogger("multiintent.trace")
+if TRACE_SPANS:
+    # Uvicorn leaves the root logger at WARNING: spans get their own level and handler
+    trace_logger.setLevel(logging.INFO)
+    _handler = logging.FileHandler(TRACE_FILE) if TRACE_FILE else logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    trace_logger.addHandler(_handler)
+    trace_logger.propagate = False
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield f"{self.name}{_labels(self.labelnames, key)} {value}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        self.values[tuple(labels[name] for name in self.labelnames)] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.buckets = buckets
+        self.values = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        series = self.values.get(key)
+        if series is None:
+            # Per-bucket counts, then sum and count
+            series = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self):
+        for key, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {series[-1]}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {series[-2]}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}"
+
+
+class Registry:
+    """
+    Minimal in-process metrics registry rendered in the Prometheus text
+    format. Metrics are plain dicts updated from the event loop, so
+    recording a value costs a dict lookup and an addition. Collectors are
+    callables returning extra metrics computed at scrape time; adding a
+    collector under a key already in use replaces the previous one.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = {}
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: tuple = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector, key: str = None):
+        """Register `collector` under `key` (default: its qualified name), e.g. again on every app startup."""
+        self.collectors[key or collector.__qualname__] = collector
+
+    def render(self) -> str:
+        lines = []
+        metrics = list(self.metrics)
+        for collector in self.collectors.values():
+            metrics.extend(collector())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests served.", ("method", "route", "status"))
+HTTP_LATENCY = REGISTRY.histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "HTTP requests being served.")
+
+LLM_CALLS = REGISTRY.counter("llm_calls_total", "LLM generations by outcome.", ("model", "outcome"))
+LLM_TTFT = REGISTRY.histogram("llm_time_to_first_token_seconds", "Time until the first generated token.", ("model",))
+LLM_DURATION = REGISTRY.histogram("llm_generation_duration_seconds", "Duration of LLM generations.", ("model",))
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "Generated tokens (streamed chunks).", ("model",))
+LLM_TOKENS_PER_SECOND = REGISTRY.histogram(
+    "llm_tokens_per_second", "Generation speed after the first token.", ("model",),
+    buckets=(1, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500),
+)
+
+VALIDATION_DURATION = REGISTRY.histogram(
+    "validation_duration_seconds", "Sandboxed validation time per intent.", ("status",)
+)
+
+
+# Export LLMCache counters at scrape time
+def cache_collector(cache):
+    def collect():
+        if cache is None:
+            return []
+        stats = cache.stats()
+        hits = Counter("llm_cache_hits_total", "LLM cache hits by tier.", ("tier",))
+        hits.values = {("memory",): stats["hits_memory"], ("disk",): stats["hits_disk"]}
+        misses = Counter("llm_cache_misses_total", "LLM cache misses.")
+        misses.values = {(): stats["misses"]}
+        ratio = Gauge("llm_cache_hit_ratio", "LLM cache hit ratio since start.")
+        ratio.values = {(): stats["hit_rate"]}
+        entries = Gauge("llm_cache_entries", "LLM cache entries by tier.", ("tier",))
+        entries.values = {("memory",): stats["memory_entries"], ("disk",): stats["disk_entries"]}
+        return [hits, misses, ratio, entries]
+    return collect
+
+
+def llm_pool_collector(client):
+    def collect():
+        stats = client.snapshot()
+        running = Gauge("llm_scheduler_running", "LLM calls holding a scheduler slot.")
+        running.values = {(): stats["running"]}
+        capacity = Gauge("llm_scheduler_capacity", "Concurrent LLM calls allowed over the healthy backends.")
+        capacity.values = {(): stats["capacity"]}
+        queued = Gauge("llm_scheduler_queued", "LLM calls waiting for a slot by priority.", ("priority",))
+        queued.values = {(level,): count for level, count in stats["queued"].items()}
+        rejected = Counter("llm_scheduler_rejected_total", "LLM calls refused with 429 by priority.", ("priority",))
+        rejected.values = {(level,): count for level, count in stats["rejected"].items()}
+        outstanding = Gauge("llm_backend_outstanding", "In-flight requests per LLM backend.", ("backend",))
+        outstanding.values = {(backend["url"],): backend["outstanding"] for backend in stats["backends"]}
+        healthy = Gauge("llm_backend_healthy", "1 if the LLM backend passed its last health check.", ("backend",))
+        healthy.values = {(backend["url"],): int(backend["healthy"]) for backend in stats["backends"]}
+        return [running, capacity, queued, rejected, outstanding, healthy]
+    return collect
+
+
+@contextmanager
+def span(name: str, **fields):
+    """Time a block; logged with the request id when TRACE_SPANS=1."""
+    if not TRACE_SPANS:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        details = " ".join(f"{key}={value}" for key, value in fields.items())
+        trace_logger.info(
+            "request=%s span=%s duration_ms=%.2f %s",
+            request_id.get(), name, (time.perf_counter() - started) * 1000, details,
+        )
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, status counts and
+    in-flight requests. Routes are labelled by their path template
+    (e.g. /jobs/{job_id}) to keep the number of series bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        started = time.perf_counter()
+        token = request_id.set(uuid.uuid4().hex[:12]) if TRACE_SPANS else None
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            HTTP_REQUESTS.inc(method=scope["method"], route=path, status=status)
+            HTTP_LATENCY.observe(elapsed, method=scope["method"], route=path)
+            if token is not None:
+                trace_logger.info(
+                    "request=%s span=http %s %s status=%s duration_ms=%.2f",
+                    request_id.get(), scope["method"], path, status, elapsed * 1000,
+                )
+                request_id.reset(token)
@@ -0,0 +1,256 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import httpx
+
+from metrics import REGISTRY
+from ollama_client import DEFAULT_MODEL, OllamaError
+
+# Model tiers per intent type, cheapest first (see model_tiers.json)
+MODEL_TIERS_PATH = os.getenv(
+    "MODEL_TIERS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_tiers.json")
+)
+# Re-load the models every N seconds so they are not evicted while idle (0 = only at startup)
+MODEL_WARM_INTERVAL = float(os.getenv("MODEL_WARM_INTERVAL", "0"))
+
+CASCADE_ATTEMPTS = REGISTRY.counter(
+    "llm_cascade_attempts_total", "Model cascade attempts by tier and outcome.", ("model", "tier", "outcome")
+)
+
+logger = logging.getLogger("multiintent.cascade")
+
+
+@dataclass
+class Tier:
+    model: str
+    options: dict = field(default_factory=dict)
+
+
+class TierStats:
+    """Attempts, outcomes and recent latencies of one model."""
+
+    def __init__(self, window: int = 500):
+        self.attempts = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=window)
+
+    def record(self, outcome: str, duration: float):
+        self.attempts += 1
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        self.latencies.append(duration)
+
+    def snapshot(self) -> dict:
+        ordered = sorted(self.latencies)
+
+        def percentile(fraction):
+            return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))] if ordered else None
+
+        return {
+            "attempts": self.attempts,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "success_rate": self.accepted / self.attempts if self.attempts else None,
+            "latency_p50": percentile(0.50),
+            "latency_p95": percentile(0.95),
+        }
+
+
+def load_tiers(path: str = MODEL_TIERS_PATH) -> dict:
+    if not os.path.exists(path):
+        logger.info("No model tiers file at %s: every intent type uses %s", path, DEFAULT_MODEL)
+        return {"default": [Tier(DEFAULT_MODEL)]}
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    return {intent_type: [Tier(**tier) for tier in tiers] for intent_type, tiers in config.items()}
+
+
+class CascadeRun:
+    """
+    One generation through a cascade of models.
+
+    `events()` yields ("token", text) while a model generates and
+    ("escalate", details) when its output is rejected and the next tier
+    takes over. Once it ends, `generation` is the accepted output (or the
+    last tier's one) and `attempts` describes every tier that was tried.
+    """
+
+    def __init__(
+        self, cascade, prompt: str, tiers: list, check=None, use_cache: bool = True, stop=None, stream: bool = True,
+        options: dict = None,
+    ):
+        self.cascade = cascade
+        self.prompt = prompt
+        self.tiers = tiers
+        self.options = options or {}
+        self.check = check
+        self.use_cache = use_cache
+        self.stop = stop
+        self.stream = stream
+        self.generation = None
+        self.model = None
+        self.accepted = False
+        self.attempts = []
+
+    async def events(self):
+        client = self.cascade.client
+        for index, tier in enumerate(self.tiers):
+            last = index == len(self.tiers) - 1
+            stop = self.stop() if self.stop is not None else None
+            options = {**tier.options, **self.options}
+            started = time.perf_counter()
+            try:
+                if self.stream:
+                    generation = client.stream(self.prompt, tier.model, options, self.use_cache, stop)
+                    async for token in generation:
+                        yield "token", token
+                else:
+                    generation = await client.generate(
+                        self.prompt, tier.model, options, use_cache=self.use_cache, stop=stop
+                    )
+            except (httpx.HTTPError, OllamaError) as e:
+                self._record(index, tier, "errors", started, str(e))
+                if last:
+                    raise
+                yield "escalate", self.attempts[-1]
+                continue
+
+            if self.check is not None:
+                accepted, reason = await self.check(generation.text)
+            else:
+                accepted = bool(generation.text.strip())
+                reason = None if accepted else "empty response"
+
+            self.generation, self.model = generation, tier.model
+            self._record(index, tier, "accepted" if accepted else "rejected", started, reason)
+            if accepted or last:
+                self.accepted = accepted
+                return
+            yield "escalate", self.attempts[-1]
+
+    def _record(self, index: int, tier: Tier, outcome: str, started: float, reason: str = None):
+        duration = time.perf_counter() - started
+        self.cascade.stats_for(tier.model).record(outcome, duration)
+        CASCADE_ATTEMPTS.inc(model=tier.model, tier=index, outcome=outcome)
+        self.attempts.append({"tier": index, "model": tier.model, "outcome": outcome, "reason": reason, "duration": duration})
+
+    async def result(self):
+        async for _ in self.events():
+            pass
+        return self
+
+
+class ModelCascade:
+    """
+    Routes generations through model tiers configured per intent type.
+
+    The cheapest model answers first; when its output fails `check` (for
+    generated code: does not parse or fails the sandbox) or the call
+    errors, the next, larger model is tried. Models are loaded at startup
+    with Ollama's keep_alive so the first request does not pay the load
+    time; models that cannot be loaded are skipped until the next
+    warm-up, and when that leaves an intent type without its last tier
+    the client's model (OLLAMA_MODEL) takes its place.
+    """
+
+    def __init__(self, client, tiers: dict = None, warm_interval: float = MODEL_WARM_INTERVAL):
+        self.client = client
+        self.tiers = tiers if tiers is not None else load_tiers()
+        self.warm_interval = warm_interval
+        self.unavailable = set()
+        self.stats = {}
+        self.warm_up_times = {}
+        self._skipped = {}
+        self._task = None
+
+    def tiers_for(self, intent_type: str = None) -> list:
+        fallback = Tier(self.client.model)
+        tiers = self.tiers.get(intent_type) or self.tiers.get("default") or [fallback]
+        available = [tier for tier in tiers if tier.model not in self.unavailable]
+        if tiers[-1].model in self.unavailable and fallback.model not in {tier.model for tier in available}:
+            # The strongest tier is missing: OLLAMA_MODEL takes its place (alone if nothing else loaded)
+            if fallback.model not in self.unavailable or not available:
+                available.append(fallback)
+        return available
+
+    def models(self) -> list:
+        return sorted({tier.model for tiers in self.tiers.values() for tier in tiers})
+
+    def stats_for(self, model: str) -> TierStats:
+        stats = self.stats.get(model)
+        if stats is None:
+            stats = self.stats[model] = TierStats()
+        return stats
+
+    def run(
+        self, prompt: str, intent_type: str = None, check=None, use_cache: bool = True, stop=None, stream: bool = True,
+        options: dict = None,
+    ) -> CascadeRun:
+        """
+        Start a cascaded generation. `check` is an async callable returning
+        (accepted, reason) for an output, `stop` a factory of per-attempt
+        stop callables and `options` override the tiers' options.
+        """
+        return CascadeRun(self, prompt, self.tiers_for(intent_type), check, use_cache, stop, stream, options)
+
+    async def warm_up(self):
+        # One model at a time: loading them all at once would compete for GPU memory
+        for model in self.models():
+            try:
+                self.warm_up_times[model] = await self.client.warm_up(model)
+                self.unavailable.discard(model)
+            except OllamaError as e:
+                # Typically a model that has not been pulled
+                logger.warning("Model %s could not be loaded: %s", model, e)
+                self.unavailable.add(model)
+            except httpx.HTTPError as e:
+                logger.warning("Ollama unreachable while loading %s: %s", model, e)
+        self._log_skipped()
+
+    # Say which tiers each intent type lost, once per change
+    def _log_skipped(self):
+        for intent_type, tiers in self.tiers.items():
+            skipped = [tier.model for tier in tiers if tier.model in self.unavailable]
+            if skipped == self._skipped.get(intent_type, []):
+                continue
+            self._skipped[intent_type] = skipped
+            serving = [tier.model for tier in self.tiers_for(intent_type)]
+            if skipped:
+                logger.warning("Intent type %s skips tiers %s, serving with %s", intent_type, skipped, serving)
+            else:
+                logger.info("Intent type %s serves with all its tiers again: %s", intent_type, serving)
+
+    async def _keep_warm(self):
+        while True:
+            await self.warm_up()
+            if not self.warm_interval:
+                return
+            await asyncio.sleep(self.warm_interval)
+
+    def start(self):
+        # Warm-up runs in the background: the app serves requests meanwhile
+        self._task = asyncio.create_task(self._keep_warm())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "tiers": {
+                intent_type: [tier.model for tier in self.tiers_for(intent_type)] for intent_type in self.tiers
+            },
+            "unavailable": sorted(self.unavailable),
+            "fallback_model": self.client.model,
+            "warm_up_seconds": self.warm_up_times,
+            "models": {model: stats.snapshot() for model, stats in self.stats.items()},
+        }
@@ -0,0 +1,341 @@
+import asyncio
+import json
+import os
+import time
+from contextlib import aclosing
+
+import httpx
+
+from llm_pool import BACKEND_CONCURRENCY, CONNECT_ERRORS, BackendPool, PriorityScheduler
+from metrics import LLM_CALLS, LLM_DURATION, LLM_TOKENS, LLM_TOKENS_PER_SECOND, LLM_TTFT
+
+# Ollama server shared by the apps (override with the OLLAMA_HOST env var),
+# or a comma-separated pool of Ollama-compatible servers in OLLAMA_HOSTS
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")
+OLLAMA_HOSTS = [host.strip() for host in os.getenv("OLLAMA_HOSTS", OLLAMA_HOST).split(",") if host.strip()]
+DEFAULT_MODEL = os.getenv("OLLAMA_MODEL", "deepseek-r1:latest")
+
+# Connection pool and timeout policy (seconds), configurable per deployment
+MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OLLAMA_MAX_KEEPALIVE_CONNECTIONS", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", "60"))
+CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "300"))
+POOL_TIMEOUT = float(os.getenv("OLLAMA_POOL_TIMEOUT", "30"))
+
+# How long Ollama keeps a model loaded after a request ("30m", "-1" = forever, "" = server default)
+KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+
+class OllamaError(Exception):
+    """Raised when Ollama answers with an HTTP error or an error chunk."""
+
+
+class GenerationStream:
+    """
+    One streamed call to /api/generate.
+
+    Iterate it to receive the generated text chunk by chunk. Once the
+    iteration ends, `text` holds the full output and `context` the
+    token context returned by Ollama in its final chunk. When the
+    response comes from the client's cache it is yielded as one chunk
+    and `cached` is set.
+
+    `stop`, if given, is called with every chunk; once it returns True
+    the response is closed, which makes Ollama abort the generation.
+
+    The call waits for a slot of the client's scheduler and runs on the
+    least loaded backend of its pool; if the connection to that backend
+    fails or times out, the next one is tried.
+    """
+
+    def __init__(self, client, payload: dict, use_cache: bool = True, stop=None):
+        self._client = client
+        self.payload = payload
+        self.model = payload["model"]
+        self.use_cache = use_cache
+        self.stop = stop
+        self.chunks = []
+        self.context = None
+        self.done = False
+        self.cached = False
+        self.stopped = False
+        self.backend = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    async def __aiter__(self):
+        cache = self._client.cache
+        # Early-stopped outputs are truncated: never mix them with full ones
+        key = cache.key(self.payload, "stop" if self.stop else "") if cache is not None else None
+        if key is not None and self.use_cache:
+            hit = await cache.get(key)
+            if hit is not None:
+                self.chunks = [hit["text"]]
+                self.context = hit.get("context")
+                self.done = self.cached = True
+                LLM_CALLS.inc(model=self.model, outcome="cached")
+                yield hit["text"]
+                return
+
+        started = time.perf_counter()
+        first_token = None
+        outcome = "error"
+        pool = self._client.pool
+        try:
+            async with self._client.scheduler.slot():
+                tried = []
+                while True:
+                    try:
+                        async with pool.use(tried) as backend:
+                            tried.append(backend)
+                            self.backend = backend.url
+                            async with aclosing(self._generate(backend, started)) as tokens:
+                                async for token in tokens:
+                                    if first_token is None:
+                                        first_token = time.perf_counter()
+                                    yield token
+                        break
+                    except CONNECT_ERRORS:
+                        # Nothing was sent yet: the next backend can take the call
+                        if len(tried) >= len(pool.backends):
+                            raise
+            outcome = "stopped" if self.stopped else "ok" if self.done else "incomplete"
+        except (GeneratorExit, asyncio.CancelledError):
+            outcome = "cancelled"
+            raise
+        finally:
+            self._record(started, first_token, outcome)
+
+        if key is not None and self.done:
+            await cache.set(key, self.model, {"text": self.text, "context": self.context})
+
+    async def _generate(self, backend, started: float):
+        async with backend.http.stream("POST", "/api/generate", json=self.payload) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                raise OllamaError(f"Ollama returned {response.status_code}: {response.text.strip()}")
+
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise OllamaError(chunk["error"])
+
+                token = chunk.get("response", "")
+                if token:
+                    if not self.chunks:
+                        LLM_TTFT.observe(time.perf_counter() - started, model=self.model)
+                    self.chunks.append(token)
+                    yield token
+
+                    if self.stop is not None and self.stop(token):
+                        self.done = self.stopped = True
+                        return
+
+                if chunk.get("done"):
+                    self.context = chunk.get("context")
+                    self.done = True
+                    return
+
+    def _record(self, started: float, first_token: float, outcome: str):
+        finished = time.perf_counter()
+        LLM_CALLS.inc(model=self.model, outcome=outcome)
+        LLM_DURATION.observe(finished - started, model=self.model)
+        LLM_TOKENS.inc(len(self.chunks), model=self.model)
+        if first_token is not None and len(self.chunks) > 1 and finished > first_token:
+            LLM_TOKENS_PER_SECOND.observe((len(self.chunks) - 1) / (finished - first_token), model=self.model)
+
+
+class OllamaClient:
+    """
+    Long-lived async client for the Ollama HTTP API.
+
+    A single instance keeps one httpx connection pool with keep-alive per
+    backend, so every generation reuses the same TCP connections instead
+    of spawning an `ollama run` process or a new client per call. Calls
+    are admitted by a priority scheduler (interactive, runtime, batch;
+    see llm_pool) and spread over the backends by outstanding requests,
+    so throughput grows with the number of model servers. Identical
+    generations that are in flight at the same time are coalesced into a
+    single upstream request (single-flight), and finished generations are
+    served from `cache` (an LLMCache) when one is given.
+    """
+
+    def __init__(
+        self,
+        hosts=OLLAMA_HOSTS,
+        model: str = DEFAULT_MODEL,
+        max_connections: int = MAX_CONNECTIONS,
+        max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = KEEPALIVE_EXPIRY,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        pool_timeout: float = POOL_TIMEOUT,
+        cache=None,
+        keep_alive: str = KEEP_ALIVE,
+        backend_concurrency: int = BACKEND_CONCURRENCY,
+    ):
+        if isinstance(hosts, str):
+            hosts = [host.strip() for host in hosts.split(",") if host.strip()]
+        self.model = model
+        self.cache = cache
+        self.keep_alive = keep_alive
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=connect_timeout,
+            pool=pool_timeout,
+        )
+        self.backend_concurrency = backend_concurrency
+        self.pool = BackendPool(hosts, self.limits, self.timeout)
+        # Concurrent generations: `backend_concurrency` per healthy backend
+        self.scheduler = PriorityScheduler(lambda: backend_concurrency * max(1, len(self.pool.healthy())))
+        self._inflight = {}
+        self._waiters = {}
+
+    def start(self):
+        self.pool.start()
+
+    def snapshot(self) -> dict:
+        return {**self.scheduler.snapshot(), "backends": [backend.snapshot() for backend in self.pool.backends]}
+
+    def build_payload(self, prompt: str, model: str = None, options: dict = None, context: list = None) -> dict:
+        payload = {
+            "model": model or self.model,
+            "prompt": prompt,
+            "stream": True,
+            "options": options or {},
+        }
+        if context:
+            # Token context of a previous generation: the prompt continues that conversation
+            payload["context"] = context
+        if self.keep_alive:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    async def warm_up(self, model: str = None) -> float:
+        """
+        Load a model into memory (a request without prompt) on every
+        healthy backend and return the time it took. Fails only if no
+        backend could load it.
+        """
+        started = time.perf_counter()
+        payload = {"model": model or self.model}
+        if self.keep_alive:
+            payload["keep_alive"] = self.keep_alive
+
+        async def load(backend):
+            response = await backend.http.post("/api/generate", json=payload)
+            if response.status_code >= 400:
+                raise OllamaError(f"Ollama returned {response.status_code}: {response.text.strip()}")
+
+        backends = self.pool.healthy() or self.pool.backends
+        results = await asyncio.gather(*(load(backend) for backend in backends), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if len(errors) == len(results):
+            raise errors[0]
+        return time.perf_counter() - started
+
+    async def embed(self, texts: list, model: str = None) -> list:
+        """Embedding vectors of `texts` (one /api/embed call on the least loaded backend, failing over)."""
+        async with self.scheduler.slot():
+            tried = []
+            while True:
+                try:
+                    async with self.pool.use(tried) as backend:
+                        tried.append(backend)
+                        response = await backend.http.post(
+                            "/api/embed", json={"model": model or self.model, "input": texts}
+                        )
+                    break
+                except CONNECT_ERRORS:
+                    if len(tried) >= len(self.pool.backends):
+                        raise
+        if response.status_code >= 400:
+            raise OllamaError(f"Ollama returned {response.status_code}: {response.text.strip()}")
+        return response.json()["embeddings"]
+
+    def stream(
+        self, prompt: str, model: str = None, options: dict = None, use_cache: bool = True, stop=None,
+        context: list = None,
+    ) -> GenerationStream:
+        """Start a streamed generation; `use_cache=False` bypasses cached responses."""
+        return GenerationStream(self, self.build_payload(prompt, model, options, context), use_cache, stop)
+
+    async def generate(
+        self,
+        prompt: str,
+        model: str = None,
+        options: dict = None,
+        coalesce: bool = True,
+        use_cache: bool = True,
+        stop=None,
+        context: list = None,
+    ) -> GenerationStream:
+        """
+        Run a generation to completion (or until `stop` returns True) and
+        return the consumed stream.
+
+        With `coalesce`, concurrent callers asking for the same (model,
+        prompt, options, context) share one upstream generation, which is
+        cancelled once every caller waiting for it has been cancelled.
+        """
+        generation = self.stream(prompt, model, options, use_cache, stop, context)
+        if not coalesce:
+            return await self._consume(generation)
+
+        key = request_key(generation.payload, use_cache, stop is not None)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._consume(generation))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        # Shielded so that one caller going away does not cancel the others;
+        # the last one leaving cancels the generation and frees its slot
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    self._forget(key, task)
+                    task.cancel()
+
+    def _forget(self, key: str, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _consume(self, generation: GenerationStream) -> GenerationStream:
+        async for _ in generation:
+            pass
+        return generation
+
+    async def aclose(self):
+        await self.pool.aclose()
+
+
+# Identity of a generation request: same model, prompt and options
+def request_key(payload: dict, use_cache: bool = True, early_stop: bool = False) -> str:
+    return json.dumps(
+        [
+            payload["model"],
+            payload["prompt"],
+            payload.get("options") or {},
+            payload.get("context"),
+            use_cache,
+            early_stop,
+        ],
+        sort_keys=True,
+    )
@@ -0,0 +1,124 @@
+import json
+import os
+
+import httpx
+
+# OpenSearch cluster used by the generated RAG intents
+OPENSEARCH_URL = os.getenv("OPENSEARCH_URL", "http://localhost:9200")
+OPENSEARCH_USER = os.getenv("OPENSEARCH_USER")
+OPENSEARCH_PASSWORD = os.getenv("OPENSEARCH_PASSWORD")
+OPENSEARCH_MAX_CONNECTIONS = int(os.getenv("OPENSEARCH_MAX_CONNECTIONS", "20"))
+OPENSEARCH_TIMEOUT = float(os.getenv("OPENSEARCH_TIMEOUT", "30"))
+
+
+class OpenSearchClient:
+    """
+    Async access layer to OpenSearch shared by the `rag_opensearch` intents.
+
+    One keep-alive connection pool serves every query. Several searches
+    can be sent in a single `_msearch` round trip, and `scan()` walks a
+    whole result set page by page with `search_after` (over a point in
+    time when the cluster supports it) as an async generator.
+    """
+
+    def __init__(
+        self,
+        base_url: str = OPENSEARCH_URL,
+        auth: tuple = None,
+        max_connections: int = OPENSEARCH_MAX_CONNECTIONS,
+        timeout: float = OPENSEARCH_TIMEOUT,
+        verify: bool = True,
+    ):
+        self.base_url = base_url
+        if auth is None and OPENSEARCH_USER:
+            auth = (OPENSEARCH_USER, OPENSEARCH_PASSWORD or "")
+        self.auth = auth
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.timeout = httpx.Timeout(timeout)
+        self.verify = verify
+        self._http = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url, auth=self.auth, limits=self.limits, timeout=self.timeout, verify=self.verify
+            )
+        return self._http
+
+    async def search(self, index: str = None, body: dict = None, **params) -> dict:
+        """Run one search; extra keyword arguments become URL parameters (e.g. q=...)."""
+        path = f"/{index}/_search" if index else "/_search"
+        response = await self.http.post(path, json=body or {}, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def msearch(self, searches, index: str = None) -> list:
+        """
+        Run many searches in a single `_msearch` request.
+
+        `searches` is a list of (index, body) pairs (index may be None);
+        returns one response per search, in the same order.
+        """
+        lines = []
+        for search_index, body in searches:
+            lines.append(json.dumps({"index": search_index} if search_index else {}))
+            lines.append(json.dumps(body))
+        path = f"/{index}/_msearch" if index else "/_msearch"
+        response = await self.http.post(
+            path, content="\n".join(lines) + "\n", headers={"Content-Type": "application/x-ndjson"}
+        )
+        response.raise_for_status()
+        return response.json()["responses"]
+
+    async def scan(self, index: str, query: dict = None, page_size: int = 1000, sort: list = None, keep_alive: str = "1m"):
+        """Yield every hit matching `query`, fetching `page_size` hits per request."""
+        pit_id = await self._open_pit(index, keep_alive)
+        body = {"size": page_size, "query": query or {"match_all": {}}, "sort": sort or ["_doc"]}
+        try:
+            while True:
+                if pit_id:
+                    body["pit"] = {"id": pit_id, "keep_alive": keep_alive}
+                    page = await self.search(body=body)
+                    pit_id = page.get("pit_id", pit_id)
+                else:
+                    page = await self.search(index, body)
+
+                hits = page["hits"]["hits"]
+                for hit in hits:
+                    yield hit
+                if len(hits) < page_size:
+                    break
+                body["search_after"] = hits[-1]["sort"]
+        finally:
+            if pit_id:
+                await self._close_pit(pit_id)
+
+    async def _open_pit(self, index: str, keep_alive: str):
+        # Clusters without point-in-time support fall back to plain search_after
+        response = await self.http.post(f"/{index}/_search/point_in_time", params={"keep_alive": keep_alive})
+        if response.status_code >= 400:
+            return None
+        return response.json().get("pit_id")
+
+    async def _close_pit(self, pit_id: str):
+        try:
+            await self.http.request("DELETE", "/_search/point_in_time", json={"pit_id": [pit_id]})
+        except httpx.HTTPError:
+            pass  # The point in time expires by itself after keep_alive
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+_client = None
+
+
+# Client shared by every intent loaded in this process
+def get_client() -> OpenSearchClient:
+    global _client
+    if _client is None:
+        _client = OpenSearchClient()
+    return _client
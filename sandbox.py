@@ -0,0 +1,218 @@
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:  # Not available on Windows: memory limits are skipped
+    resource = None
+
+from intent_precheck import PreChecker, install_hint
+from metrics import VALIDATION_DURATION
+
+# Validation pool settings, configurable per deployment
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", str(os.cpu_count() or 2)))
+SANDBOX_TIMEOUT = float(os.getenv("SANDBOX_TIMEOUT", "10"))
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "1024"))
+SANDBOX_MAX_JOBS = int(os.getenv("SANDBOX_MAX_JOBS", "20"))
+# Static pre-check (imports, input(), import-time network I/O) before executing the code
+SANDBOX_PRECHECK = os.getenv("SANDBOX_PRECHECK", "1") != "0"
+
+
+# Execute one intent's code and describe the outcome (runs inside a worker)
+def validate_code(code: str, filename: str) -> dict:
+    started = time.perf_counter()
+    result = {"status": "success", "message": "✅ The tool's code is valid and executed correctly."}
+
+    try:
+        compiled = compile(code, filename, "exec")
+        module_name = os.path.splitext(os.path.basename(filename))[0]
+        exec(compiled, {"__name__": module_name, "__file__": filename})
+    except SyntaxError as e:
+        result = {
+            "status": "error",
+            "error_type": "SyntaxError",
+            "lineno": e.lineno,
+            "message": f"⚠️ Syntax error on line {e.lineno}: {e.msg}",
+        }
+    except ImportError as e:
+        hint = f" {install_hint(e.name.split('.')[0])}" if isinstance(e, ModuleNotFoundError) and e.name else ""
+        result = {
+            "status": "error",
+            "error_type": type(e).__name__,
+            "message": f"⚠️ {type(e).__name__}: {str(e)}.{hint}",
+        }
+    except (Exception, SystemExit):
+        error_type, error, tb = sys.exc_info()
+        frames = [frame for frame in traceback.extract_tb(tb) if frame.filename == filename]
+        result = {
+            "status": "error",
+            "error_type": error_type.__name__,
+            "lineno": frames[-1].lineno if frames else None,
+            "message": f"⚠️ Error executing the code: {traceback.format_exc()}",
+        }
+
+    result["duration"] = time.perf_counter() - started
+    return result
+
+
+def _worker_main(conn, memory_limit_mb: int):
+    if resource is not None and memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    # Intents must not block on the terminal or write to the server's output
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    sys.stdin = open(os.devnull)
+    sys.stdout = open(os.devnull, "w")
+
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        conn.send(validate_code(*job))
+
+
+class _Worker:
+    def __init__(self, context, memory_limit_mb: int, max_jobs: int):
+        self.context = context
+        self.memory_limit_mb = memory_limit_mb
+        self.max_jobs = max_jobs
+        self._spawn()
+
+    def _spawn(self):
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_worker_main, args=(child_conn, self.memory_limit_mb), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def restart(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+        self._spawn()
+
+    # Blocking: called from a thread so the event loop keeps serving requests
+    def run(self, code: str, filename: str, timeout: float) -> dict:
+        self.conn.send((code, filename))
+
+        if not self.conn.poll(timeout):
+            self.restart()
+            return {
+                "status": "error",
+                "error_type": "Timeout",
+                "message": f"⚠️ Validation timed out after {timeout:g}s (the code may be waiting for input or looping).",
+                "duration": timeout,
+            }
+
+        try:
+            result = self.conn.recv()
+        except EOFError:
+            self.process.join()
+            exitcode = self.process.exitcode
+            self._spawn()
+            return {
+                "status": "error",
+                "error_type": "WorkerCrash",
+                "message": f"⚠️ The validation worker crashed (exit code {exitcode}), possibly by exceeding its memory limit.",
+            }
+
+        # Recycle workers regularly: validated code may leave imports and patches behind
+        self.jobs += 1
+        if self.jobs >= self.max_jobs:
+            self.restart()
+        return result
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class ValidationPool:
+    """
+    Pre-forked pool of processes that validate (execute) untrusted intent
+    code away from the server process.
+
+    Each job runs with a wall-clock `timeout` and an address-space limit;
+    a worker that exceeds its timeout is killed and replaced. Workers have
+    stdin closed, so code calling input() fails instead of hanging.
+
+    With `precheck`, code is first checked statically (see
+    intent_precheck); code with errors is rejected without using a
+    worker, and the pre-check's warnings are added to the sandbox result.
+    """
+
+    def __init__(
+        self,
+        workers: int = SANDBOX_WORKERS,
+        timeout: float = SANDBOX_TIMEOUT,
+        memory_limit_mb: int = SANDBOX_MEMORY_MB,
+        max_jobs_per_worker: int = SANDBOX_MAX_JOBS,
+        precheck: bool = SANDBOX_PRECHECK,
+    ):
+        self.size = workers
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.precheck = PreChecker() if precheck else None
+        self.workers = []
+        self._idle = None
+
+    def start(self):
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        context = multiprocessing.get_context(method)
+        self.workers = [
+            _Worker(context, self.memory_limit_mb, self.max_jobs_per_worker) for _ in range(self.size)
+        ]
+        self._idle = asyncio.Queue()
+        for worker in self.workers:
+            self._idle.put_nowait(worker)
+        if self.precheck is not None:
+            self.precheck.modules.build()
+
+    async def validate(self, code: str, filename: str, timeout: float = None) -> dict:
+        started = time.perf_counter()
+        diagnostics = []
+        if self.precheck is not None:
+            checked = self.precheck.check(code, filename)
+            if checked["status"] == "error":
+                VALIDATION_DURATION.observe(time.perf_counter() - started, status="error")
+                return {**checked, "stage": "precheck"}
+            diagnostics = checked["diagnostics"]
+
+        worker = await self._idle.get()
+        job = asyncio.get_running_loop().run_in_executor(None, worker.run, code, filename, timeout or self.timeout)
+        try:
+            result = await asyncio.shield(job)
+            # Includes the wait for an idle worker, unlike result["duration"]
+            VALIDATION_DURATION.observe(time.perf_counter() - started, status=result["status"])
+            return {**result, "stage": "sandbox", "diagnostics": diagnostics}
+        finally:
+            # A cancelled caller must not hand back a worker that is still busy
+            if job.done():
+                self._idle.put_nowait(worker)
+            else:
+                job.add_done_callback(lambda _: self._idle.put_nowait(worker))
+
+    async def validate_many(self, jobs) -> list:
+        """Validate (code, filename) pairs in parallel across the pool."""
+        return await asyncio.gather(*(self.validate(code, filename) for code, filename in jobs))
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+        self.workers = []
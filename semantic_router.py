@@ -0,0 +1,228 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+
+import httpx
+import numpy as np
+
+from llm_pool import BATCH, OllamaBusy, priority
+from ollama_client import OllamaError
+
+# Router settings, configurable per deployment
+EMBED_MODEL = os.getenv("EMBED_MODEL", "nomic-embed-text")
+EMBED_BATCH = int(os.getenv("EMBED_BATCH", "64"))
+# Utterances accepted in one /route/ request
+ROUTE_MAX_UTTERANCES = int(os.getenv("ROUTE_MAX_UTTERANCES", "256"))
+TOOL_TYPES_PATH = os.getenv(
+    "TOOL_TYPES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tool_types.json")
+)
+
+logger = logging.getLogger("multiintent.router")
+
+
+def load_descriptions(path: str = TOOL_TYPES_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {tool_type: config.get("description", "") for tool_type, config in json.load(f).items()}
+
+
+class VectorIndex:
+    """
+    Array-backed cosine index.
+
+    Vectors are stored L2-normalized as rows of one float32 matrix that
+    grows by doubling, so a batch of queries is a single matrix product
+    followed by a partial sort (argpartition) per row. Removing a name
+    moves the last row into its slot, keeping the rows contiguous.
+    """
+
+    def __init__(self, dim: int = None, capacity: int = 256):
+        self.dim = dim
+        self.names = []
+        self.rows = {}
+        self._capacity = capacity
+        self._matrix = None if dim is None else np.zeros((capacity, dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.rows
+
+    @staticmethod
+    def normalize(vectors) -> np.ndarray:
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def add(self, names: list, vectors):
+        """Insert or replace the vectors of `names`."""
+        vectors = self.normalize(vectors)
+        if self._matrix is None:
+            self.dim = vectors.shape[1]
+            self._matrix = np.zeros((self._capacity, self.dim), dtype=np.float32)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}")
+
+        for name, vector in zip(names, vectors):
+            row = self.rows.get(name)
+            if row is None:
+                row = len(self.names)
+                if row == len(self._matrix):
+                    self._matrix = np.concatenate([self._matrix, np.zeros_like(self._matrix)])
+                self.rows[name] = row
+                self.names.append(name)
+            self._matrix[row] = vector
+
+    def remove(self, name: str) -> bool:
+        row = self.rows.pop(name, None)
+        if row is None:
+            return False
+        last = len(self.names) - 1
+        if row != last:
+            moved = self.names[last]
+            self._matrix[row] = self._matrix[last]
+            self.names[row] = moved
+            self.rows[moved] = row
+        self.names.pop()
+        return True
+
+    def query(self, vectors, k: int = 5, min_score: float = None) -> list:
+        """For each query vector, the k most similar (name, cosine) pairs, best first."""
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        queries = self.normalize(vectors)
+        if not self.names:
+            return [[] for _ in range(len(queries))]
+        scores = queries @ self._matrix[:len(self.names)].T
+        k = min(k, len(self.names))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+        results = []
+        for rows, row_scores in zip(top.tolist(), top_scores.tolist()):
+            results.append([
+                (self.names[row], score) for row, score in zip(rows, row_scores)
+                if min_score is None or score >= min_score
+            ])
+        return results
+
+
+class SemanticRouter:
+    """
+    Routes utterances to intents by embedding similarity.
+
+    Each intent is described by its `# Prompt used:` header plus the
+    tool_types.json description of its type, embedded once through the
+    Ollama /api/embed endpoint and kept in a VectorIndex. The index
+    follows the intent registry: removals apply at once, new and changed
+    intents are queued and embedded in batches by a background task.
+    Embeddings are keyed by the hash of the described text, so editing an
+    intent's code without touching its prompt does not re-embed it.
+    """
+
+    def __init__(self, client, registry, type_of=None, model: str = EMBED_MODEL, batch_size: int = EMBED_BATCH):
+        self.client = client
+        self.registry = registry
+        self.type_of = type_of
+        self.model = model
+        self.batch_size = batch_size
+        self.descriptions = load_descriptions()
+        self.index = VectorIndex()
+        self._hashes = {}
+        self._pending = {}
+        self._wake = None
+        self._task = None
+        registry.add_listener(self._on_change)
+
+    def document(self, info) -> str:
+        """Text embedded for an intent: its prompt and the description of its type."""
+        parts = [info.prompt or os.path.splitext(info.name)[0].replace("_", " ")]
+        intent_type = self.type_of(info.name) if self.type_of is not None else None
+        if self.descriptions.get(intent_type):
+            parts.append(self.descriptions[intent_type])
+        return "\n".join(parts)
+
+    def _on_change(self, name: str, info):
+        if info is None:
+            self._pending.pop(name, None)
+            self._hashes.pop(name, None)
+            self.index.remove(name)
+        else:
+            self._pending[name] = self.document(info)
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _embed_pending(self):
+        while self._pending:
+            batch = []
+            for name, text in list(self._pending.items()):
+                digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+                del self._pending[name]
+                if self._hashes.get(name) != digest:
+                    batch.append((name, text, digest))
+                if len(batch) == self.batch_size:
+                    break
+            if not batch:
+                return
+            try:
+                vectors = await self.client.embed([text for _, text, _ in batch], self.model)
+            except (httpx.HTTPError, OllamaError, OllamaBusy):
+                # Kept pending: the worker retries them
+                for name, text, _ in batch:
+                    self._pending.setdefault(name, text)
+                raise
+            # Intents deleted while their embedding was computed are left out
+            embedded = [(entry, vector) for entry, vector in zip(batch, vectors) if entry[0] in self.registry.intents]
+            if embedded:
+                self.index.add([name for (name, _, _), _ in embedded], [vector for _, vector in embedded])
+                self._hashes.update({name: digest for (name, _, digest), _ in embedded})
+
+    async def _work(self):
+        priority.set(BATCH)
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            try:
+                await self._embed_pending()
+            except (httpx.HTTPError, OllamaError, OllamaBusy) as e:
+                logger.warning("Could not embed %d intents: %s", len(self._pending), e)
+                await asyncio.sleep(getattr(e, "retry_after", 5))
+                self._wake.set()
+            except Exception:
+                # E.g. a malformed response or vectors of another dimension: keep following the registry
+                logger.exception("Embedding %d intents failed", len(self._pending))
+                await asyncio.sleep(5)
+                self._wake.set()
+
+    def start(self):
+        """Queue every intent of the registry and start following its changes."""
+        for info in self.registry.intents.values():
+            self._pending[info.name] = self.document(info)
+        self._wake = asyncio.Event()
+        self._wake.set()
+        self._task = asyncio.create_task(self._work())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def route(self, utterances: list, k: int = 3, min_score: float = None) -> list:
+        """Top-k intents for each utterance: one embedding call and one index query for the whole batch."""
+        if not utterances:
+            return []
+        vectors = await self.client.embed(utterances, self.model)
+        return [
+            [{"intent_name": name, "score": score} for name, score in matches]
+            for matches in self.index.query(vectors, k, min_score)
+        ]
+
+    def snapshot(self) -> dict:
+        return {"model": self.model, "intents": len(self.index), "dim": self.index.dim, "pending": len(self._pending)}
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import queue
+import sqlite3
+
+# SQLite database queried by the generated NL -> SQL intents
+SQLITE_DATABASE = os.getenv("SQLITE_DATABASE", "database.db")
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "4"))
+SQLITE_FETCH_SIZE = int(os.getenv("SQLITE_FETCH_SIZE", "500"))
+SQLITE_STATEMENT_CACHE = 256
+# Opt-in: switch the database to WAL once, a persistent change to a file the pool does not own
+SQLITE_ENABLE_WAL = os.getenv("SQLITE_ENABLE_WAL", "0") == "1"
+
+
+class SQLitePool:
+    """
+    Pool of read-only SQLite connections for the `nlp_to_sql` intents.
+
+    Connections are opened read-only once and reused, and each keeps a
+    cache of prepared statements for parameterized queries. The database
+    is left as it is: put it in WAL mode as a setup step (`PRAGMA
+    journal_mode = WAL`, once) so readers never block its writer, or let
+    the pool do it with `enable_wal=True` / SQLITE_ENABLE_WAL=1. Results are streamed in `fetchmany` batches
+    from a worker thread, so a query never blocks the event loop and
+    memory stays flat however many rows it returns.
+    """
+
+    def __init__(self, database: str = SQLITE_DATABASE, size: int = SQLITE_POOL_SIZE, enable_wal: bool = SQLITE_ENABLE_WAL):
+        self.database = database
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._slots = None
+        self._wal_checked = not enable_wal
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._wal_checked:
+            self._enable_wal()
+        conn = sqlite3.connect(
+            f"file:{self.database}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            cached_statements=SQLITE_STATEMENT_CACHE,
+        )
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _enable_wal(self):
+        # journal_mode is persistent, but can only be changed with write access
+        try:
+            conn = sqlite3.connect(f"file:{self.database}?mode=rw", uri=True)
+            try:
+                conn.execute("PRAGMA journal_mode = WAL")
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+        self._wal_checked = True
+
+    async def acquire(self) -> sqlite3.Connection:
+        # Waiting for a free connection happens on the event loop, not in a thread
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        await self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return await asyncio.to_thread(self._connect)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn: sqlite3.Connection):
+        self._idle.put_nowait(conn)
+        self._slots.release()
+
+    async def stream(self, sql: str, params=(), batch_size: int = SQLITE_FETCH_SIZE):
+        """Yield the rows of a parameterized query in lists of up to `batch_size`."""
+        conn = await self.acquire()
+        cursor = None
+        try:
+            cursor = await asyncio.to_thread(conn.execute, sql, params)
+            while True:
+                rows = await asyncio.to_thread(cursor.fetchmany, batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            if cursor is not None:
+                cursor.close()
+            self.release(conn)
+
+    async def rows(self, sql: str, params=(), batch_size: int = SQLITE_FETCH_SIZE):
+        """Yield the rows of a parameterized query one by one."""
+        async for batch in self.stream(sql, params, batch_size):
+            for row in batch:
+                yield row
+
+    async def fetch_all(self, sql: str, params=()) -> list:
+        results = []
+        async for batch in self.stream(sql, params):
+            results.extend(batch)
+        return results
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pool = None
+
+
+# Pool shared by every intent loaded in this process
+def get_pool() -> SQLitePool:
+    global _pool
+    if _pool is None:
+        _pool = SQLitePool()
+    return _pool